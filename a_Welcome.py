@@ -1,6 +1,8 @@
 
 import streamlit as st
-import requests
+from asset_cache import get_asset
+
+ZONE_MAP_URL = "https://upload.wikimedia.org/wikipedia/commons/7/75/National_Grid_Zone_Map.png"
 
 def main():
     st.title("Renewable Strategy Dashboard")
@@ -33,13 +35,10 @@ def main():
         - Revenue & Risk Simulations
         """)
     with col2:
-        image_url = "https://upload.wikimedia.org/wikipedia/commons/7/75/National_Grid_Zone_Map.png"
-        try:
-            response = requests.get(image_url)
-            if response.status_code == 200:
-                st.image(image_url, caption="Regional market zones (illustrative)", use_container_width=True)
-        except:
-            pass
+        # Served from the local asset cache; the first fetch happens in the background
+        zone_map = get_asset("National_Grid_Zone_Map.png", ZONE_MAP_URL)
+        if zone_map is not None:
+            st.image(zone_map, caption="Regional market zones (illustrative)", use_container_width=True)
 
 if __name__ == "__main__":
     main()
@@ -1,47 +1,64 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from time_index import get_time_index
+from profiling import stage
+from chart_reduction import cached_figure, decimate
+
+START_YEAR, END_YEAR = 2025, 2060
+
+def yearly_spread_figure(yearly):
+    # At most MAX_POINTS points per technology, however fine the time resolution behind it
+    yearly = decimate(yearly, "Year", "Price_Spread_Strike_vs_Market", by="Technology")
+    return px.line(yearly, x="Year", y="Price_Spread_Strike_vs_Market", color="Technology", markers=True)
 
 def main():
     st.title("Zonal vs National Price Spread")
 
-    df = pd.read_csv("data/cfd_processed.csv", parse_dates=["Settlement_Date"])
-    df = df[(df["Settlement_Date"] >= "2025-01-01") & (df["Settlement_Date"] <= "2060-12-31")]
-    df["Year"] = df["Settlement_Date"].dt.year
+    # Every aggregate below is two searchsorted lookups per series on the prefix-sum index
+    index = get_time_index()
+    first, last = index.date_range
+    default = (max(first, pd.Timestamp(START_YEAR, 1, 1)).date(), min(last, pd.Timestamp(END_YEAR, 12, 31)).date())
+    start, end = st.sidebar.slider("Settlement Dates", first.date(), last.date(), default, format="YYYY-MM-DD")
 
-    techs = df["Technology"].unique().tolist()
+    techs = index.groups["Technology"].unique().tolist()
     selected = st.sidebar.multiselect("Select Technologies", techs, default=techs)
-    df = df[df["Technology"].isin(selected)]
+    where = {"Technology": selected}
 
     st.subheader("Strike vs Market Spread (Avg £/MWh)")
-    market_spread = df.groupby("Technology")["Price_Spread_Strike_vs_Market"].mean().sort_values().reset_index()
-    fig1 = px.bar(market_spread, x="Price_Spread_Strike_vs_Market", y="Technology",
-                  orientation="h", color="Price_Spread_Strike_vs_Market",
-                  color_continuous_scale="Turbo")
-    fig1.update_layout(xaxis_title="Spread (£/MWh)", yaxis_title="Technology", height=400)
-    st.plotly_chart(fig1, use_container_width=True)
+    market_spread = index.query(["Technology"], "Price_Spread_Strike_vs_Market", start=start, end=end, where=where)
+    market_spread = market_spread.sort_values("Price_Spread_Strike_vs_Market")
+    with stage("chart.market_spread"):
+        fig1 = px.bar(market_spread, x="Price_Spread_Strike_vs_Market", y="Technology",
+                      orientation="h", color="Price_Spread_Strike_vs_Market",
+                      color_continuous_scale="Turbo")
+        fig1.update_layout(xaxis_title="Spread (£/MWh)", yaxis_title="Technology", height=400)
+        st.plotly_chart(fig1, use_container_width=True)
     st.caption("💡 Technologies like Offshore Wind show favorable spreads, indicating better strike price leverage in the market.")
     st.markdown("---")
 
     st.subheader("Strike vs IMRP Spread (Avg £/MWh)")
-    imrp_spread = df.groupby("Technology")["Price_Spread_Strike_vs_IMRP"].mean().sort_values().reset_index()
-    fig2 = px.bar(imrp_spread, x="Price_Spread_Strike_vs_IMRP", y="Technology",
-                  orientation="h", color="Price_Spread_Strike_vs_IMRP",
-                  color_continuous_scale="Plasma")
-    fig2.update_layout(xaxis_title="Spread (£/MWh)", yaxis_title="Technology", height=400)
-    st.plotly_chart(fig2, use_container_width=True)
+    imrp_spread = index.query(["Technology"], "Price_Spread_Strike_vs_IMRP", start=start, end=end, where=where)
+    imrp_spread = imrp_spread.sort_values("Price_Spread_Strike_vs_IMRP")
+    with stage("chart.imrp_spread"):
+        fig2 = px.bar(imrp_spread, x="Price_Spread_Strike_vs_IMRP", y="Technology",
+                      orientation="h", color="Price_Spread_Strike_vs_IMRP",
+                      color_continuous_scale="Plasma")
+        fig2.update_layout(xaxis_title="Spread (£/MWh)", yaxis_title="Technology", height=400)
+        st.plotly_chart(fig2, use_container_width=True)
     st.caption("💡 IMRP comparisons help assess how well different strategies align with regional benchmarks.")
     st.markdown("---")
 
     st.subheader("Yearly Strike vs Market Spread")
-    yearly = df.groupby(["Year", "Technology"])["Price_Spread_Strike_vs_Market"].mean().reset_index()
-    fig3 = px.line(yearly, x="Year", y="Price_Spread_Strike_vs_Market", color="Technology", markers=True)
-    fig3.update_layout(
-        xaxis_title="Year",
-        yaxis_title="Spread (£/MWh)",
-        height=500
-    )
-    st.plotly_chart(fig3, use_container_width=True)
+    yearly = index.query(["Year", "Technology"], "Price_Spread_Strike_vs_Market", start=start, end=end, where=where)
+    with stage("chart.yearly_spread"):
+        fig3 = cached_figure(yearly_spread_figure, yearly)
+        fig3.update_layout(
+            xaxis_title="Year",
+            yaxis_title="Spread (£/MWh)",
+            height=500
+        )
+        st.plotly_chart(fig3, use_container_width=True)
     st.caption("💡 Long-term consistency or volatility in spread reveals strategy risk profiles over time.")
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from memo import memoize
+from profiling import profiled
+from sampling import estimate, standard_normals
+from solver_session import solve_lp
+from strategy_mc import STRATEGIES, VOLATILITY
+
+YEARS = 25
+DISCOUNT_RATE = 0.06
+PERSISTENCE = 0.6
+CVAR_ALPHA = 0.05
+SCALING_COUNTS = [1000, 5000, 10000, 25000, 50000]
+
+
+@memoize("simulate.revenue_scenarios", skip_if_none=("seed",))
+def revenue_scenarios(base, n_scenarios, years=YEARS, sds=VOLATILITY, persistence=PERSISTENCE, seed=None,
+                      method="pseudo"):
+    """Annual revenue paths (£m), shape (n_scenarios, years, strategies), with AR(1) shocks per strategy."""
+    rng = np.random.default_rng(seed)
+    shocks = standard_normals(n_scenarios, years * len(base), method, rng).reshape(n_scenarios, years, len(base))
+    innovation = np.sqrt(1 - persistence ** 2)
+    for t in range(1, years):
+        shocks[:, t] = persistence * shocks[:, t - 1] + innovation * shocks[:, t]
+    return np.asarray(base, dtype=float) + np.asarray(sds, dtype=float) * shocks
+
+
+def build_allocation_lp(revenues, risk_aversion=1.0, alpha=CVAR_ALPHA, min_annual=None, cvar_floor=None,
+                        discount_rate=DISCOUNT_RATE):
+    """Rockafellar-Uryasev LP maximising mean PV - risk_aversion * CVaR of the loss (-PV).
+
+    Variables are [w_1..w_k, eta, u_1..u_n]: strategy shares, the VaR level and one shortfall per scenario.
+    Each scenario adds one constraint row with k + 2 nonzeros, so the model grows linearly with scenarios.
+    min_annual bounds the expected revenue of every year and cvar_floor the mean PV of the worst alpha tail.
+    Returns (objective, rows, senses, rhs, lb, ub).
+    """
+    n, years, k = revenues.shape
+    discount = (1 + discount_rate) ** -np.arange(1, years + 1)
+    pv = np.einsum("ntk,t->nk", revenues, discount)
+    tail_weight = 1 / (alpha * n)
+
+    objective = np.concatenate([pv.mean(axis=0), [-risk_aversion], np.full(n, -risk_aversion * tail_weight)])
+    # u_s >= -PV_s - eta, written as PV_s + eta + u_s >= 0
+    blocks = [[sparse.csr_matrix(pv), sparse.csr_matrix(np.ones((n, 1))), sparse.identity(n, format="csr")],
+              [sparse.csr_matrix(np.ones((1, k))), None, None]]
+    senses = [">="] * n + ["="]
+    rhs = [0.0] * n + [1.0]
+    if min_annual is not None:
+        blocks.append([sparse.csr_matrix(revenues.mean(axis=0)), None, None])
+        senses += [">="] * years
+        rhs += [min_annual] * years
+    if cvar_floor is not None:
+        # Mean PV of the worst tail, -(eta + tail_weight * sum(u)), must reach the floor
+        blocks.append([None, sparse.csr_matrix([[1.0]]), sparse.csr_matrix(np.full((1, n), tail_weight))])
+        senses.append("<=")
+        rhs.append(-cvar_floor)
+
+    rows = sparse.bmat(blocks, format="csr")
+    lb = np.concatenate([np.zeros(k), [-np.inf], np.zeros(n)])
+    ub = np.concatenate([np.ones(k), [np.inf], np.full(n, np.inf)])
+    return objective, rows, senses, np.array(rhs), lb, ub
+
+
+@profiled("optimize.allocation_lp")
+@memoize("optimize.allocation_lp")
+def optimize_allocation(revenues, risk_aversion=1.0, alpha=CVAR_ALPHA, min_annual=None, cvar_floor=None,
+                        discount_rate=DISCOUNT_RATE, backend=None, method="pseudo"):
+    """Optimal capacity shares across strategies, or None when the constraints cannot all be met.
+
+    method is the sampling method revenues were drawn with, used for the standard error of expected PV.
+    """
+    start = time.perf_counter()
+    objective, rows, senses, rhs, lb, ub = build_allocation_lp(revenues, risk_aversion, alpha, min_annual,
+                                                               cvar_floor, discount_rate)
+    built = time.perf_counter()
+    x, backend = solve_lp(objective, rows, senses, rhs, lb, ub, backend)
+    solved = time.perf_counter()
+    if x is None:
+        return None
+
+    n, years, k = revenues.shape
+    weights = np.clip(x[:k], 0, None)
+    discount = (1 + discount_rate) ** -np.arange(1, years + 1)
+    pv = np.einsum("ntk,t->nk", revenues, discount) @ weights
+    tail = np.sort(pv)[:max(1, int(np.ceil(alpha * n)))]
+    expected_pv, pv_stderr = estimate(pv, method)
+    return {
+        "weights": dict(zip(STRATEGIES, weights)),
+        "expected_pv": expected_pv,
+        "pv_stderr": pv_stderr,
+        "cvar_pv": tail.mean(),
+        "annual_revenue": revenues.mean(axis=0) @ weights,
+        "build_seconds": built - start,
+        "solve_seconds": solved - built,
+        "nonzeros": rows.nnz,
+        "backend": backend
+    }
+
+
+def scaling_table(base, counts=SCALING_COUNTS, years=YEARS, risk_aversion=1.0, alpha=CVAR_ALPHA, seed=0):
+    """Build and solve times of the allocation LP for each scenario count."""
+    records = []
+    for n in counts:
+        result = optimize_allocation(revenue_scenarios(base, n, years, seed=seed), risk_aversion, alpha)
+        if result is None:
+            continue
+        records.append({
+            "Scenarios": n,
+            "Nonzeros": result["nonzeros"],
+            "Build (s)": result["build_seconds"],
+            "Solve (s)": result["solve_seconds"],
+            "Total (s)": result["build_seconds"] + result["solve_seconds"]
+        })
+    return pd.DataFrame(records)
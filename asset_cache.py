@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+
+from profiling import profiled
+
+ASSET_DIR = "assets"
+CACHE_DIR = ".cache/assets"
+DEFAULT_TTL = 7 * 24 * 3600
+FETCH_TIMEOUT = 10
+RETRY_BACKOFF = 15 * 60
+
+_memory = {}
+_refreshing = set()
+_failed = {}
+_lock = threading.Lock()
+
+
+def _fetch(name, url):
+    try:
+        import requests
+        response = requests.get(url, timeout=FETCH_TIMEOUT)
+        if response.status_code != 200:
+            raise OSError(f"HTTP {response.status_code}")
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = os.path.join(CACHE_DIR, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(response.content)
+        os.replace(path + ".tmp", path)
+        with _lock:
+            _memory[name] = (response.content, time.time())
+            _failed.pop(name, None)
+    except Exception:
+        # Offline hosts keep serving whatever copy they already have, and don't retry on every render
+        with _lock:
+            _failed[name] = time.time()
+    finally:
+        with _lock:
+            _refreshing.discard(name)
+
+
+def _refresh_async(name, url):
+    with _lock:
+        if url is None or name in _refreshing or time.time() - _failed.get(name, -RETRY_BACKOFF) < RETRY_BACKOFF:
+            return
+        _refreshing.add(name)
+    threading.Thread(target=_fetch, args=(name, url), name=f"asset-{name}", daemon=True).start()
+
+
+@profiled("assets.get_asset")
+def get_asset(name, url=None, ttl=DEFAULT_TTL):
+    """Bytes of a static asset without ever waiting on the network.
+
+    Looks in memory, then the bundled assets/ directory, then the on-disk cache. Cached copies
+    older than ttl, and assets not available locally yet, are fetched from url on a background
+    thread, retried no sooner than RETRY_BACKOFF after a failure; until a copy exists this returns None.
+    """
+    with _lock:
+        entry = _memory.get(name)
+    if entry is None:
+        for directory, fetched_from_url in ((ASSET_DIR, False), (CACHE_DIR, True)):
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    # Bundled assets never go stale
+                    entry = (f.read(), os.path.getmtime(path) if fetched_from_url else float("inf"))
+                with _lock:
+                    _memory[name] = entry
+                break
+
+    if entry is None or time.time() - entry[1] > ttl:
+        _refresh_async(name, url)
+    return entry[0] if entry is not None else None
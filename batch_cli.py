@@ -0,0 +1,228 @@
+import inspect
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from bidding import BIDS, bid_curve, optimal_bid
+from data_store import CSV_PATH, STORE_DIR
+from finance import discount_factors, discounted_payback, irr, portfolio_roi
+from scenario_executor import default_workers
+from stress import stress_table
+
+ANALYSES = {}
+
+_context = None
+
+
+def analysis(name):
+    def register(fn):
+        ANALYSES[name] = fn
+        return fn
+    return register
+
+
+# Each analysis takes the shared context plus keyword parameters (defaults match the page sliders)
+# and returns a frame of results. The models come from Streamlit-free modules imported above, so a
+# worker loads them once at start-up and job timings cover only the computation
+
+@analysis("roi")
+def _roi(ctx, capex_per_mw=1_000_000, capacity_mw=100, om_cost_per_mwh=15, degradation_rate=0.01, asset_life=25):
+    prices = ctx["prices"]
+    assets = pd.DataFrame({
+        "Reference_Type": prices.index,
+        "Capacity_MW": capacity_mw,
+        "CapEx_GBP_Per_MW": capex_per_mw,
+        "OM_Cost_GBP_Per_MWh": om_cost_per_mwh,
+        "Degradation_Rate": degradation_rate,
+        "Asset_Life_Years": asset_life,
+        "Annual_Generation_MWh": ctx["annual_gen"]
+    })
+    return portfolio_roi(assets, prices)[["Reference_Type", "Lifetime_Output_MWh", "Revenue", "Cost", "ROI"]]
+
+
+@analysis("npv")
+def _npv(ctx, discount_rate=0.06):
+    years = ctx["years"]
+    cashflows = np.vstack([ctx["cashflows"], ctx["tech_cashflows"].to_numpy()])
+    payback = discounted_payback(cashflows, discount_rate)
+    return pd.DataFrame({
+        "Scope": ["All"] + list(ctx["tech_cashflows"].index),
+        "NPV": cashflows @ discount_factors(discount_rate, len(years))[0],
+        "IRR": irr(cashflows),
+        "Payback_Year": np.where(payback >= 0, years[payback], -1)
+    })
+
+
+@analysis("stress")
+def _stress(ctx, gen=250_000, base_price=70, strike=100, shock_pct=-20):
+    df = stress_table(gen, base_price, strike, shock_pct)
+    df["Delta_Pct"] = 100 * df["Delta_Revenue"] / df["Base_Revenue"]
+    return df
+
+
+@analysis("bidding")
+def _bidding(ctx, bid_price=80, market_price=60, generation=300_000, clearing_price=None, clearing_scale=10,
+             risk_aversion=0.0):
+    stats = bid_curve([bid_price], market_price, generation, clearing_price=clearing_price,
+                      clearing_scale=clearing_scale)
+    best = optimal_bid(bid_curve(BIDS, market_price, generation, clearing_price=clearing_price,
+                                 clearing_scale=clearing_scale), risk_aversion)
+    return stats.assign(Optimal_Bid=best["Bid"], Optimal_Expected_Revenue=best["Expected_Revenue"],
+                        Optimal_CVaR_Revenue=best["CVaR_Revenue"])
+
+
+def build_context(csv_path=CSV_PATH, store_dir=STORE_DIR):
+    """The settlement-derived inputs the pages read off the cube, computed once per batch."""
+    from cfd_cube import load_cube, rollup
+    cube = load_cube(store_dir, csv_path)
+    recent = cube[(cube["Year"] >= 2025) & (cube["Year"] <= 2060)]
+    cf = rollup(cube, ["Year"], "CFD_Payments_GBP", stat="sum", end_year=2060)
+    by_tech = rollup(cube, ["Technology", "Year"], "CFD_Payments_GBP", stat="sum", end_year=2060)
+    tech_cf = by_tech.pivot(index="Technology", columns="Year", values="CFD_Payments_GBP")
+    return {
+        "annual_gen": rollup(recent, None, "CFD_Generation_MWh")["CFD_Generation_MWh"].iloc[0],
+        "prices": rollup(recent, ["Reference_Type"], "Strike_Price_GBP_Per_MWh")
+        .set_index("Reference_Type")["Strike_Price_GBP_Per_MWh"],
+        "years": cf["Year"].to_numpy(),
+        "cashflows": cf["CFD_Payments_GBP"].to_numpy(),
+        "tech_cashflows": tech_cf.reindex(columns=cf["Year"]).fillna(0),
+    }
+
+
+def _expand(job):
+    # List-valued parameters sweep: one job per combination
+    swept = {k: v for k, v in job.items() if isinstance(v, list)}
+    if not swept:
+        return [job]
+    return [{**job, **dict(zip(swept, combo))} for combo in itertools.product(*swept.values())]
+
+
+def load_jobs(path):
+    """Parameter sets from a CSV (one row per job) or YAML file, each with an "analysis" key.
+
+    YAML may be a list of jobs or a mapping with "defaults" merged into every entry of "jobs";
+    list-valued parameters expand to one job per combination.
+    """
+    if path.endswith((".yaml", ".yml")):
+        import yaml
+        with open(path) as f:
+            spec = yaml.safe_load(f)
+        defaults, entries = ({}, spec) if isinstance(spec, list) else (spec.get("defaults", {}), spec["jobs"])
+        jobs = [job for entry in entries for job in _expand({**defaults, **entry})]
+    else:
+        frame = pd.read_csv(path)
+        jobs = [{k: v for k, v in row.items() if not pd.isna(v)} for row in frame.to_dict("records")]
+    for i, job in enumerate(jobs):
+        if job.get("analysis") not in ANALYSES:
+            raise ValueError(f"Job {i}: unknown analysis {job.get('analysis')!r}; choose from {sorted(ANALYSES)}")
+        # Catch misspelt parameters before any worker starts, rather than as one failure per job
+        accepted = list(inspect.signature(ANALYSES[job["analysis"]]).parameters)[1:]
+        unknown = sorted(k for k in job if k != "analysis" and k not in accepted)
+        if unknown:
+            raise ValueError(f"Job {i} ({job['analysis']}): unknown parameters {unknown}; choose from {accepted}")
+    return jobs
+
+
+def _init_worker(context):
+    global _context
+    _context = context
+
+
+def run_job(job_id, job):
+    """Run one parameter set in this process; never raises, so one bad row can't sink the batch."""
+    params = {k: v.item() if isinstance(v, np.generic) else v for k, v in job.items() if k != "analysis"}
+    start = time.perf_counter()
+    try:
+        result = ANALYSES[job["analysis"]](_context, **params)
+        error = None
+    except Exception:
+        result, error = None, traceback.format_exc(limit=3)
+    timing = {
+        "Job": job_id,
+        "Analysis": job["analysis"],
+        "Seconds": time.perf_counter() - start,
+        "Rows": 0 if result is None else len(result),
+        "Status": "ok" if error is None else "error",
+        "Error": error,
+        "Worker": os.getpid()
+    }
+    if result is not None:
+        result = result.assign(Job=job_id, **{f"param_{k}": v for k, v in params.items()})
+    return timing, result
+
+
+def run_batch(jobs, context, workers=None):
+    """Run every job, spread over worker processes; returns ({analysis: results frame}, timings frame)."""
+    workers = workers or default_workers()
+    outcomes = []
+    if workers == 1:
+        _init_worker(context)
+        outcomes = [run_job(i, job) for i, job in enumerate(jobs)]
+    else:
+        # Spawned, like the scenario pool; the context is shipped once per worker rather than per job
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(context,)) as pool:
+            futures = [pool.submit(run_job, i, job) for i, job in enumerate(jobs)]
+            outcomes = [future.result() for future in as_completed(futures)]
+
+    timings = pd.DataFrame([timing for timing, _ in outcomes]).sort_values("Job", ignore_index=True)
+    results = {}
+    for name in ANALYSES:
+        frames = [r for t, r in outcomes if r is not None and t["Analysis"] == name]
+        if frames:
+            results[name] = pd.concat(frames, ignore_index=True).sort_values("Job", kind="stable", ignore_index=True)
+    return results, timings
+
+
+def timing_summary(timings):
+    """Job count, failures and job-time statistics per analysis."""
+    return timings.groupby("Analysis").agg(
+        Jobs=("Job", "count"),
+        Failed=("Status", lambda s: int((s != "ok").sum())),
+        Total_s=("Seconds", "sum"),
+        Mean_s=("Seconds", "mean"),
+        P95_s=("Seconds", lambda s: float(np.percentile(s, 95))),
+        Max_s=("Seconds", "max")
+    ).reset_index()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run dashboard analyses headlessly over a file of parameter sets.")
+    parser.add_argument("params", help=f"YAML or CSV of jobs, each with an 'analysis' of {', '.join(ANALYSES)}")
+    parser.add_argument("--out", type=str, default="batch_results", help="Directory for the Parquet outputs")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default SCENARIO_WORKERS or CPUs)")
+    parser.add_argument("--csv", type=str, default=CSV_PATH, help="Source settlement CSV")
+    parser.add_argument("--store", type=str, default=STORE_DIR, help="Parquet store directory")
+    args = parser.parse_args()
+
+    try:
+        jobs = load_jobs(args.params)
+    except ValueError as exc:
+        parser.error(str(exc))
+    start = time.perf_counter()
+    context = build_context(args.csv, args.store)
+    results, timings = run_batch(jobs, context, args.workers)
+    wall = time.perf_counter() - start
+
+    os.makedirs(args.out, exist_ok=True)
+    for name, frame in results.items():
+        frame.to_parquet(os.path.join(args.out, f"{name}.parquet"), index=False)
+    timings.to_parquet(os.path.join(args.out, "timings.parquet"), index=False)
+
+    summary = timing_summary(timings)
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:,.4g}"))
+    print(f"{len(jobs)} jobs in {wall:.2f}s wall ({timings['Seconds'].sum():.2f}s of job time); "
+          f"results in {args.out}/")
+    failed = timings[timings["Status"] != "ok"]
+    for _, row in failed.iterrows():
+        print(f"Job {row['Job']} ({row['Analysis']}) failed:\n{row['Error']}", file=sys.stderr)
+    if len(failed):
+        sys.exit(1)
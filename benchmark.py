@@ -0,0 +1,243 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import memo
+from bidding import price_kernel
+from cfd_cube import build_cube, rollup, stream_cube
+from data_store import load_cfd
+from finance import discounted_payback, irr, npv_curve, portfolio_roi
+from scenario_executor import run_scenarios
+from shared_dataset import get_dataset
+from solver_session import get_session
+from stress import stress_grid
+from strategy_mc import VOLATILITY, adaptive_choices
+from synthetic_data import generate_cfd, write_cfd_csv
+from time_index import get_time_index
+
+BASELINE_PATH = "benchmark_baseline.json"
+# The frame-based benchmarks hold settlements in memory; larger sizes only reach the file/store-backed ones
+IN_MEMORY_ROWS = 5_000_000
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _in_memory(ctx):
+    """The (frame, cube) for benchmarks that need rows in memory, built on first use and capped at IN_MEMORY_ROWS."""
+    if "df" not in ctx:
+        df = generate_cfd(min(ctx["rows"], IN_MEMORY_ROWS), ctx["seed"])
+        df["Year"] = df["Settlement_Date"].dt.year
+        ctx["df"], ctx["cube"] = df, build_cube(df)
+    return ctx["df"], ctx["cube"]
+
+
+# Each setup returns (callable, items processed per call) for one dataset context
+
+@benchmark("store_read")
+def _store_read(ctx):
+    columns = ["Year", "Technology", "Price_Spread_Strike_vs_Market"]
+    load_cfd(columns, start="2025-01-01", end="2060-12-31", csv_path=ctx["csv_path"], store_dir=ctx["store_dir"])
+    return (lambda: load_cfd(columns, start="2025-01-01", end="2060-12-31",
+                             csv_path=ctx["csv_path"], store_dir=ctx["store_dir"])), ctx["rows"]
+
+
+@benchmark("shared_view")
+def _shared_view(ctx):
+    paths = {"csv_path": ctx["csv_path"], "store_dir": ctx["store_dir"], "dataset_dir": ctx["dataset_dir"]}
+    get_dataset(**paths)
+    columns = ["Year", "Technology", "Price_Spread_Strike_vs_Market"]
+    return (lambda: get_dataset(**paths).frame(columns, start="2025-01-01", end="2060-12-31")), ctx["rows"]
+
+
+@benchmark("time_query")
+def _time_query(ctx):
+    index = get_time_index(csv_path=ctx["csv_path"], store_dir=ctx["store_dir"], dataset_dir=ctx["dataset_dir"])
+
+    def run():
+        index.query(["Technology"], ["CFD_Generation_MWh", "CFD_Payments_GBP"], stat="sum",
+                    start="2030-03-01", end="2045-09-30")
+        index.query(["Year", "Technology"], "Price_Spread_Strike_vs_Market", start="2025-01-01", end="2060-12-31")
+    return run, ctx["rows"]
+
+
+@benchmark("spread_aggregation")
+def _spread_aggregation(ctx):
+    df, _ = _in_memory(ctx)
+    return (lambda: rollup(build_cube(df), ["Year", "Technology"], "Price_Spread_Strike_vs_Market")), len(df)
+
+
+@benchmark("stream_aggregation")
+def _stream_aggregation(ctx):
+    return (lambda: stream_cube(100_000, csv_path=ctx["csv_path"], store_dir=ctx["store_dir"])), ctx["rows"]
+
+
+@benchmark("cfd_summary")
+def _cfd_summary(ctx):
+    _, cube = _in_memory(ctx)
+
+    def run():
+        rollup(cube, ["Technology"], ["CFD_Generation_MWh", "CFD_Payments_GBP", "Avoided_GHG_tonnes_CO2e"], stat="sum")
+        rollup(cube, ["Technology", "Reference_Type"], "Subsidy_Rate")
+    return run, len(cube)
+
+
+@benchmark("npv_irr")
+def _npv_irr(ctx):
+    by_tech = rollup(_in_memory(ctx)[1], ["Technology", "Year"], "CFD_Payments_GBP", stat="sum")
+    cashflows = by_tech.pivot(index="Technology", columns="Year", values="CFD_Payments_GBP").fillna(0).values
+    # Investment-shaped rows (upfront outflow) so IRR has a root to find
+    cashflows = np.hstack([-cashflows.sum(axis=1, keepdims=True) / 3, cashflows])
+    cashflows = np.repeat(cashflows, 1000, axis=0) * np.random.default_rng(0).uniform(0.8, 1.2, (len(cashflows) * 1000, 1))
+
+    def run():
+        irr(cashflows)
+        discounted_payback(cashflows, 0.06)
+        npv_curve(cashflows, np.linspace(0, 0.2, 41))
+    return run, len(cashflows)
+
+
+@benchmark("portfolio_roi")
+def _portfolio_roi(ctx):
+    n = 100_000
+    rng = np.random.default_rng(0)
+    assets = pd.DataFrame({
+        "Reference_Type": rng.choice(["IMRP", "BMRP"], n),
+        "Capacity_MW": rng.uniform(10, 300, n),
+        "CapEx_GBP_Per_MW": rng.uniform(5e5, 3e6, n),
+        "OM_Cost_GBP_Per_MWh": rng.uniform(0, 100, n),
+        "Degradation_Rate": rng.uniform(0, 0.05, n),
+        "Asset_Life_Years": rng.integers(5, 41, n),
+        "Annual_Generation_MWh": rng.uniform(1e4, 1e6, n),
+    })
+    prices = pd.Series({"IMRP": 90.0, "BMRP": 110.0})
+    return (lambda: portfolio_roi(assets, prices)), n
+
+
+@benchmark("bidding_simulation")
+def _bidding_simulation(ctx):
+    n = 1_000_000
+    return (lambda: run_scenarios(price_kernel, n, (60, 8, "pseudo"), seed=0, workers=1)), n
+
+
+@benchmark("stress_test")
+def _stress_test(ctx):
+    axes = (np.arange(50000, 500001, 10000), np.arange(40, 121), np.arange(50, 151), np.arange(-50, 51))
+    return (lambda: stress_grid(*axes)), int(np.prod([len(a) for a in axes]))
+
+
+@benchmark("strategy_optimization")
+def _strategy_optimization(ctx):
+    session = get_session([np.ones(3)], ["="])
+    values = np.random.default_rng(0).normal([80, 65, 75], VOLATILITY, size=(200, 3))
+
+    def run():
+        adaptive_choices([80, 65, 75], VOLATILITY, 10_000, seed=0, workers=1)
+        for row in values:
+            session.solve(row, [1])
+    return run, 10_000 + len(values)
+
+
+def _measure(fn, repeat):
+    fn()  # warm-up
+    latencies = []
+    for _ in range(repeat):
+        # Memoized cores would otherwise answer every timed call from the warm-up's cache entry
+        memo.clear_caches()
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    memo.clear_caches()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return np.array(latencies), peak
+
+
+def run_benchmarks(sizes, names=None, repeat=5, seed=0):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            csv_path = os.path.join(tmp, f"cfd_{rows}.csv")
+            # Chunked, so writing the 50M-row file never holds it in memory
+            write_cfd_csv(csv_path, rows, seed)
+            ctx = {"rows": rows, "seed": seed, "csv_path": csv_path,
+                   "store_dir": os.path.join(tmp, f"store_{rows}"), "dataset_dir": os.path.join(tmp, f"shared_{rows}")}
+            for name in names or BENCHMARKS:
+                fn, items = BENCHMARKS[name](ctx)
+                latencies, peak = _measure(fn, repeat)
+                results.append({
+                    "benchmark": name,
+                    "rows": rows,
+                    "p50_s": float(np.percentile(latencies, 50)),
+                    "p95_s": float(np.percentile(latencies, 95)),
+                    "max_s": float(latencies.max()),
+                    "items_per_s": items / float(np.percentile(latencies, 50)),
+                    "peak_mb": peak / 1e6,
+                })
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Mark each result against the baseline p50; returns the regressions."""
+    regressions = []
+    for r in results:
+        base = baseline.get(f"{r['benchmark']}@{r['rows']}")
+        r["baseline_p50_s"] = base
+        r["status"] = "new" if base is None else "ok"
+        if base is not None and r["p50_s"] > base * (1 + tolerance):
+            r["status"] = "REGRESSION"
+            regressions.append(r)
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's compute cores on synthetic data.")
+    parser.add_argument("--rows", type=str, default="10000,100000,1000000",
+                        help="Comma-separated dataset sizes (up to 50,000,000)")
+    parser.add_argument("--only", type=str, default=None, help="Comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these p50 latencies as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown before flagging")
+    parser.add_argument("--json", type=str, default=None, help="Write full results to this JSON file")
+    parser.add_argument("--write-csv", type=str, default=None,
+                        help="Only write a synthetic CSV of the first --rows size to this path")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.rows.split(",")]
+    if args.write_csv:
+        write_cfd_csv(args.write_csv, sizes[0])
+        sys.exit(0)
+
+    results = run_benchmarks(sizes, args.only.split(",") if args.only else None, args.repeat)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+
+    table = pd.DataFrame(results)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:,.4g}"))
+    if args.json:
+        table.to_json(args.json, orient="records", indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({f"{r['benchmark']}@{r['rows']}": r["p50_s"] for r in results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from memo import memoize
+from profiling import profiled
+from sampling import normal_draws
+
+PRICE_VOLATILITY = 8
+BIDS = np.arange(30, 151)
+CVAR_ALPHA = 0.10
+
+
+def price_kernel(size, seed_seq, params):
+    market_price, scale, method = params
+    return normal_draws([market_price], [scale], size, method, np.random.default_rng(seed_seq))[:, 0]
+
+
+@profiled("compute.bid_curve")
+@memoize("compute.bid_curve")
+def bid_curve(bids, market_price, generation, scale=PRICE_VOLATILITY, clearing_price=None, clearing_scale=10,
+              alpha=CVAR_ALPHA):
+    """Closed-form revenue statistics for every bid when the market price is N(market_price, scale).
+
+    Revenue is generation x max(bid - price, 0). With a clearing_price, a bid is only awarded when it is at
+    or below an independent N(clearing_price, clearing_scale) auction clearing price and earns nothing otherwise.
+    CVaR is the mean revenue over the worst alpha of outcomes.
+    """
+    bids = np.asarray(bids, dtype=float)
+    z = (bids - market_price) / scale
+    if clearing_price is None:
+        award = np.ones_like(bids)
+    else:
+        award = norm.sf(bids, loc=clearing_price, scale=clearing_scale)
+    no_award = 1 - award
+    safe_award = np.where(award > 0, award, 1)
+
+    def quantile(q):
+        # The lowest (1 - award) of outcomes are the unawarded zeros; above that, top-up revenue quantiles
+        inner = norm.ppf(np.clip((q - no_award) / safe_award, 0, 1))
+        return np.where(q <= no_award, 0.0, generation * scale * np.maximum(z + inner, 0))
+
+    # Integral of the top-up quantile function over its lowest beta: sigma * [z(Phi(a) - Phi(-z)) + phi(z) - phi(a)]
+    a = norm.ppf(np.clip((alpha - no_award) / safe_award, 0, 1))
+    tail = np.where(a > -z, z * (norm.cdf(a) - norm.cdf(-z)) + norm.pdf(z) - norm.pdf(a), 0.0)
+
+    return pd.DataFrame({
+        "Bid": bids,
+        "Award_Probability": award,
+        "Win_Probability": award * norm.cdf(z),
+        "Expected_Revenue": award * generation * scale * (z * norm.cdf(z) + norm.pdf(z)),
+        "P10_Revenue": quantile(0.10),
+        "P90_Revenue": quantile(0.90),
+        "CVaR_Revenue": award * generation * scale * tail / alpha
+    })
+
+
+def optimal_bid(curve, risk_aversion=0.0):
+    """Row of the curve maximising mean - risk_aversion * (mean - CVaR), i.e. penalising expected shortfall."""
+    objective = curve["Expected_Revenue"] - risk_aversion * (curve["Expected_Revenue"] - curve["CVaR_Revenue"])
+    return curve.assign(Objective=objective).loc[objective.idxmax()]
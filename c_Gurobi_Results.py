@@ -1,33 +1,25 @@
 import streamlit as st
+import asyncio
+import uuid
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 import plotly.express as px
-import gurobipy as gp
-from gurobipy import GRB
-
-def run_gurobi_strategy(cfd_val, ppa_val, merchant_val):
-    try:
-        model = gp.Model()
-        strategies = ["CfD", "PPA", "Merchant"]
-        values = {
-            "CfD": np.random.normal(cfd_val, 5),
-            "PPA": np.random.normal(ppa_val, 8),
-            "Merchant": np.random.normal(merchant_val, 10)
-        }
-
-        x = {s: model.addVar(vtype=GRB.BINARY, name=s) for s in strategies}
-        model.setObjective(gp.quicksum(values[s] * x[s] for s in strategies), GRB.MAXIMIZE)
-        model.addConstr(gp.quicksum(x[s] for s in strategies) == 1)
-        model.setParam('OutputFlag', 0)
-        model.optimize()
-
-        for s in strategies:
-            if x[s].X > 0.5:
-                return s
-    except gp.GurobiError:
-        return "Error"
-    return "Unknown"
+from solver_session import get_session
+from profiling import stage
+from sampling import METHODS
+import job_manager
+from strategy_mc import STRATEGIES, VOLATILITY, adaptive_choices_job, convergence_counts
+
+PROGRESS_SHARD = 1_000
+
+def run_gurobi_strategy(values, constraints):
+    # Only needed when side constraints are present; the plain pick-one model is an argmax
+    rows = [np.ones(len(STRATEGIES))] + [coeffs for coeffs, _, _ in constraints]
+    senses = ["="] + [sense for _, sense, _ in constraints]
+    rhs = [1] + [r for _, _, r in constraints]
+    x = get_session(rows, senses).solve(values, rhs)
+    return int(np.argmax(x)) if x is not None else -1
 
 def generate_insight(distribution):
     most_common = distribution.iloc[distribution['Count'].idxmax()]
@@ -45,6 +37,32 @@ Adjusting the expected value sliders could significantly impact this outcome, es
 """
     return insight
 
+def selection_summary(choices):
+    steps = np.arange(100, len(choices) + 1, 100)
+    counts = convergence_counts(choices, steps)
+    summary_df = pd.DataFrame({
+        "Strategy": np.tile(STRATEGIES, len(steps)),
+        "Count": counts.ravel(),
+        "Simulations": np.repeat(steps, len(STRATEGIES))
+    })
+    return summary_df.sort_values(by=["Simulations", "Strategy"])
+
+def trend_chart(summary_df, max_simulations):
+    fig_line = px.line(summary_df, x="Simulations", y="Count", color="Strategy", markers=True)
+    fig_line.update_layout(height=450, xaxis_range=[0, max_simulations])
+    return fig_line
+
+async def follow(job, progress_bar, chart, max_simulations):
+    # Redraw as shards land; a rerun interrupts this loop but leaves the job running
+    async for progress, partial in job.stream():
+        progress_bar.progress(progress, text=f"{progress:.0%} of {max_simulations:,} simulations")
+        if partial is not None and len(partial) >= 100:
+            chart.plotly_chart(trend_chart(selection_summary(partial), max_simulations), key=f"trends_{len(partial)}")
+
+def cancel_job(job, key):
+    job_manager.cancel(job)
+    st.session_state["gurobi_cancelled"] = key
+
 def main():
     st.title("Gurobi Strategy Optimization (Simulated)")
 
@@ -55,39 +73,71 @@ def main():
     merchant_val = st.sidebar.slider("Expected Merchant Value", 50, 100, 75)
 
     max_simulations = st.slider("Max Number of Simulations", 100, 10000, 1000, step=500)
+    tolerance = st.sidebar.slider("Stop When Shares Within ± (%)", 0.0, 5.0, 0.0, step=0.5,
+                                  help="0 runs every simulation") / 100
+    method = st.sidebar.selectbox("Sampling Method", METHODS,
+                                  help="Antithetic pairs reach a given tolerance with fewer simulations.")
+    seed = st.sidebar.number_input("Random Seed", 0, 2**31 - 1, 42)
+
+    # Simulations run as a background job keyed by the inputs: reruns with the same inputs (from any
+    # session) attach to it, and jobs nobody is following any more are cancelled
+    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    args = ([cfd_val, ppa_val, merchant_val], VOLATILITY, max_simulations)
+    kwargs = dict(tolerance=tolerance, seed=seed, solve=run_gurobi_strategy, method=method,
+                  shard_size=PROGRESS_SHARD)
+    key = job_manager.job_key("simulate.strategy_choices", *args, **kwargs)
+    previous = st.session_state.get("gurobi_job")
+    if st.session_state.get("gurobi_cancelled") == key:
+        st.info("Simulation cancelled.")
+        if st.button("Run Again"):
+            del st.session_state["gurobi_cancelled"]
+            st.rerun()
+        return
+    job = job_manager.submit("simulate.strategy_choices", adaptive_choices_job, *args, watcher=session_id, **kwargs)
+    if previous is not None and previous is not job:
+        job_manager.release(previous, session_id)
+    st.session_state["gurobi_job"] = job
 
-    strategy_counts = []
-    steps = list(range(100, max_simulations + 1, 100))
-    for sim in steps:
-        batch = [run_gurobi_strategy(cfd_val, ppa_val, merchant_val) for _ in range(sim)]
-        counts = pd.Series(batch).value_counts().reset_index()
-        counts.columns = ["Strategy", "Count"]
-        counts["Simulations"] = sim
-        strategy_counts.append(counts)
-
-    summary_df = pd.concat(strategy_counts)
-    summary_df = summary_df.sort_values(by=["Simulations", "Strategy"])
+    st.subheader("Strategy Selection Trends vs Simulations")
+    chart = st.empty()
+    if not job.done:
+        cancel_slot = st.empty()
+        cancel_slot.button("Cancel Simulation", on_click=cancel_job, args=(job, key))
+        progress_bar = st.progress(job.progress)
+        asyncio.run(follow(job, progress_bar, chart, max_simulations))
+        progress_bar.empty()
+        cancel_slot.empty()
+    if job.status == "error":
+        st.error(f"Simulation failed: {job.error}")
+        return
+    if job.status != "done":
+        st.info("Simulation cancelled.")
+        return
+
+    choices = job.result
+    if len(choices) < max_simulations:
+        st.info(f"Strategy shares converged to within ±{tolerance:.1%} after {len(choices):,} simulations.")
+    summary_df = selection_summary(choices)
 
     # Line chart
-    st.subheader("Strategy Selection Trends vs Simulations")
-    fig_line = px.line(summary_df, x="Simulations", y="Count", color="Strategy", markers=True)
-    fig_line.update_layout(height=450)
-    st.plotly_chart(fig_line)
+    with stage("chart.strategy_trends"):
+        chart.plotly_chart(trend_chart(summary_df, max_simulations), key="trends")
 
     # Donut chart
     st.subheader("Final Strategy Distribution")
-    final_df = summary_df[summary_df['Simulations'] == summary_df['Simulations'].max()]
-    fig_donut = go.Figure(data=[go.Pie(
-        labels=final_df['Strategy'],
-        values=final_df['Count'],
-        hole=0.4,
-        textinfo='label+percent',
-        textfont_size=20,
-        marker=dict(line=dict(color='#000000', width=2)),
-        domain={'x': [0, 1], 'y': [0, 1]}
-    )])
-    fig_donut.update_layout(height=700)
-    st.plotly_chart(fig_donut)
+    final_df = summary_df[summary_df['Simulations'] == summary_df['Simulations'].max()].reset_index(drop=True)
+    with stage("chart.strategy_donut"):
+        fig_donut = go.Figure(data=[go.Pie(
+            labels=final_df['Strategy'],
+            values=final_df['Count'],
+            hole=0.4,
+            textinfo='label+percent',
+            textfont_size=20,
+            marker=dict(line=dict(color='#000000', width=2)),
+            domain={'x': [0, 1], 'y': [0, 1]}
+        )])
+        fig_donut.update_layout(height=700)
+        st.plotly_chart(fig_donut)
 
     # Auto-generated markdown insights
     st.markdown(generate_insight(final_df))
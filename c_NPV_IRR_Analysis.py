@@ -1,33 +1,34 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from numpy_financial import irr
 import plotly.graph_objects as go
-from fpdf import FPDF
-from io import BytesIO
+from cfd_cube import load_cube, rollup
+from finance import SENSITIVITY_STEP, discount_factors, discounted_payback, irr, npv_curve, sensitivity
+from profiling import stage
+from chart_reduction import tornado_figure
+from report_renderer import build_npv_report, figure_hash, get_job, submit, submit_many, warm_up
+
+def npv_cases(cases, tech_cf):
+    """NPV for every row of cases: a Discount_Rate plus a payment scale per technology (column)."""
+    cashflows = cases[list(tech_cf.index)].to_numpy() @ tech_cf.values
+    return (cashflows * discount_factors(cases["Discount_Rate"], tech_cf.shape[1])).sum(axis=1)
 
 def main():
     st.title(" NPV and IRR Analysis")
 
-    df = pd.read_csv("data/cfd_processed.csv", parse_dates=["Settlement_Date"])
-    df["Year"] = df["Settlement_Date"].dt.year
-    df = df[df["Year"] <= 2060]
-    cf = df.groupby("Year")["CFD_Payments_GBP"].sum().reset_index()
+    cube = load_cube()
+    cf = rollup(cube, ["Year"], "CFD_Payments_GBP", stat="sum", end_year=2060)
 
     rate = st.sidebar.slider("Discount Rate (%)", 2.0, 12.0, 6.0) / 100
     cashflows = cf["CFD_Payments_GBP"].values
-    dcf = [cf / (1 + rate)**i for i, cf in enumerate(cashflows)]
-    npv = sum(dcf)
+    dcf = cashflows * discount_factors(rate, len(cashflows))[0]
+    npv = dcf.sum()
 
-    try:
-        irr_val = irr(cashflows)
-        irr_display = f"{irr_val*100:.2f}%" if np.isfinite(irr_val) else "Not Defined"
-    except:
-        irr_display = "Not Computable"
+    irr_val = irr(cashflows)
+    irr_display = f"{irr_val*100:.2f}%" if np.isfinite(irr_val) else "Not Defined"
 
-    cumulative_dcf = np.cumsum(dcf)
-    payback_idx = np.argmax(cumulative_dcf >= 0)
-    payback_year = cf["Year"].iloc[payback_idx] if cumulative_dcf[payback_idx] >= 0 else "Not Achieved"
+    payback_idx = discounted_payback(cashflows, rate)
+    payback_year = cf["Year"].iloc[payback_idx] if payback_idx >= 0 else "Not Achieved"
 
     st.subheader("Financial Summary")
     col1, col2, col3 = st.columns(3)
@@ -35,18 +36,69 @@ def main():
     col2.metric("IRR", irr_display)
     col3.metric("Payback Year", payback_year)
 
-    fig = go.Figure()
-    fig.add_trace(go.Bar(x=cf["Year"], y=cashflows, name="Nominal", marker_color="green"))
-    fig.add_trace(go.Scatter(x=cf["Year"], y=dcf, name="Discounted", mode="lines+markers", line=dict(color="red", width=3)))
-    fig.update_layout(
-        title="Nominal vs Discounted CfD Payments",
-        xaxis_title="Year",
-        yaxis_title="Payments (£)",
-        template="plotly_white",
-        margin=dict(t=60, b=40),
-        xaxis=dict(range=[cf["Year"].min(), 2060])
-    )
-    st.plotly_chart(fig)
+    with stage("chart.cashflows"):
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=cf["Year"], y=cashflows, name="Nominal", marker_color="green"))
+        fig.add_trace(go.Scatter(x=cf["Year"], y=dcf, name="Discounted", mode="lines+markers", line=dict(color="red", width=3)))
+        fig.update_layout(
+            title="Nominal vs Discounted CfD Payments",
+            xaxis_title="Year",
+            yaxis_title="Payments (£)",
+            template="plotly_white",
+            margin=dict(t=60, b=40),
+            xaxis=dict(range=[cf["Year"].min(), 2060])
+        )
+        st.plotly_chart(fig)
+
+    # Per-technology metrics, one cashflow row per technology
+    by_tech = rollup(cube, ["Technology", "Year"], "CFD_Payments_GBP", stat="sum", end_year=2060)
+    tech_cf = by_tech.pivot(index="Technology", columns="Year", values="CFD_Payments_GBP")
+    tech_cf = tech_cf.reindex(columns=cf["Year"]).fillna(0)
+    tech_irr = irr(tech_cf.values)
+    tech_payback = discounted_payback(tech_cf.values, rate)
+    tech_df = pd.DataFrame({
+        "Technology": tech_cf.index,
+        "NPV (£)": tech_cf.values @ discount_factors(rate, tech_cf.shape[1])[0],
+        "IRR": [f"{v*100:.2f}%" if np.isfinite(v) else "Not Defined" for v in tech_irr],
+        "Payback Year": [cf["Year"].iloc[i] if i >= 0 else "Not Achieved" for i in tech_payback]
+    })
+    st.subheader("Metrics by Technology")
+    st.dataframe(tech_df.style.format({"NPV (£)": "£{:,.0f}"}))
+
+    rates = np.linspace(0, 0.20, 81)
+    curves = npv_curve(np.vstack([cashflows, tech_cf.values]), rates)
+    with stage("chart.npv_sweep"):
+        fig_sweep = go.Figure()
+        for name, curve in zip(["Total"] + list(tech_cf.index), curves):
+            fig_sweep.add_trace(go.Scatter(x=rates * 100, y=curve, name=name, mode="lines"))
+        fig_sweep.add_vline(x=rate * 100, line_dash="dash", line_color="gray")
+        fig_sweep.update_layout(
+            title="NPV vs Discount Rate",
+            xaxis_title="Discount Rate (%)",
+            yaxis_title="NPV (£)",
+            template="plotly_white"
+        )
+        st.plotly_chart(fig_sweep)
+
+    # Sensitivity: the rate and each technology's payments moved down and up, evaluated together
+    st.subheader("NPV Sensitivity")
+    step = st.slider("Perturbation (± %)", 1, 50, int(SENSITIVITY_STEP * 100), key="npv_sensitivity_step") / 100
+    base_inputs = {"Discount_Rate": rate, **{tech: 1.0 for tech in tech_cf.index}}
+    # The rate moves by the step's share of a 0-10% range, so a rate near zero still moves
+    tornado = sensitivity(lambda cases: npv_cases(cases, tech_cf), base_inputs, step,
+                          spans={"Discount_Rate": step * 0.10}, floor=0)
+    labels = {"Discount_Rate": "Discount Rate", **{tech: f"{tech} Payments" for tech in tech_cf.index}}
+    tornado["Input"] = tornado["Input"].map(labels)
+    with stage("chart.npv_tornado"):
+        fig_tornado = tornado_figure(tornado, "NPV (£)")
+        st.plotly_chart(fig_tornado)
+    st.dataframe(tornado[["Input", "Low_Value", "High_Value", "Low_Output", "High_Output", "Swing",
+                          "Elasticity"]].style.format({
+        "Low_Value": "{:,.4g}", "High_Value": "{:,.4g}", "Low_Output": "£{:,.0f}", "High_Output": "£{:,.0f}",
+        "Swing": "£{:,.0f}", "Elasticity": "{:+.2f}"
+    }, na_rep="—"), hide_index=True)
+    st.caption(f"💡 Payments move ±{step:.0%} and the discount rate ±{step * 10:.1f} points. Elasticity is the % "
+               "change in NPV per 1% change in the input; a technology's payment elasticity is its share of total NPV.")
 
     st.markdown("### What This Means")
     st.markdown(
@@ -63,57 +115,52 @@ def main():
         mime="text/csv"
     )
 
-    if st.button("Generate PDF Report"):
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.add_page()
-        pdf.set_font("Helvetica", size=12)
-
-        pdf.set_font("Helvetica", "B", 16)
-        pdf.cell(0, 10, "NPV and IRR Analysis Report", ln=True)
-
-        pdf.set_font("Helvetica", "", 12)
-        pdf.cell(0, 10, f"Discount Rate: {rate*100:.1f}%", ln=True)
-        pdf.cell(0, 10, f"NPV: £{npv:,.0f}", ln=True)
-        pdf.cell(0, 10, f"IRR: {irr_display}", ln=True)
-        pdf.cell(0, 10, f"Payback Year: {payback_year}", ln=True)
-
-        pdf.ln(5)
-        pdf.multi_cell(w=190, h=8, txt="Interpretation: NPV > 0 and IRR > discount rate means the project is investable.")
-        pdf.multi_cell(w=190, h=8, txt="Payback Year indicates when cumulative discounted returns recover investment.")
-
-        pdf.ln(5)
-        pdf.set_font("Helvetica", "B", 14)
-        pdf.cell(0, 10, "Cashflow Table", ln=True)
-        pdf.set_font("Helvetica", "", 10)
-
-        for i in range(len(cf)):
-            y = cf["Year"].iloc[i]
-            n = cf["CFD_Payments_GBP"].iloc[i]
-            d = dcf[i]
-            line = f"{y}: Nominal = £{n:,.0f}, Discounted = £{d:,.0f}"
-            pdf.multi_cell(w=190, h=8, txt=line)
-
-        try:
-            import plotly.io as pio
-            chart_img = BytesIO()
-            pio.write_image(fig, chart_img, format="png")
-            chart_img.seek(0)
-            pdf.add_page()
-            pdf.image(chart_img, x=10, y=30, w=190)
-        except Exception:
-            pdf.add_page()
-            pdf.set_font("Helvetica", "I", 12)
-            pdf.multi_cell(w=190, h=10, txt="Chart image not included. Please install 'kaleido' to enable chart rendering.")
-
-        # ✅ This avoids all .encode() errors
-        pdf_bytes = bytes(pdf.output(dest="S"))
-        st.download_button(
-            label="Download PDF Report",
-            data=pdf_bytes,
-            file_name="npv_irr_report.pdf",
-            mime="application/pdf"
-        )
+    # Reports render on a background pool keyed by their inputs, so reruns pick up finished work
+    warm_up()
+    sections = [{
+        "title": "NPV and IRR Analysis Report",
+        "rate": rate, "npv": npv, "irr": irr_display, "payback": payback_year,
+        "years": cf["Year"].tolist(), "nominal": cashflows.tolist(), "discounted": dcf.tolist(),
+        "figure": fig
+    }]
+    for i, tech in enumerate(tech_cf.index):
+        tech_dcf = tech_cf.values[i] * discount_factors(rate, tech_cf.shape[1])[0]
+        sections.append({
+            "title": f"{tech}: NPV and IRR",
+            "rate": rate, "npv": tech_dcf.sum(), "irr": tech_df["IRR"].iloc[i],
+            "payback": tech_df["Payback Year"].iloc[i],
+            "years": cf["Year"].tolist(), "nominal": tech_cf.values[i].tolist(), "discounted": tech_dcf.tolist()
+        })
+    fig_hash = figure_hash(fig)
+    report_key = ("npv_report", fig_hash, rate)
+    # One job per technology, so the technology reports render in parallel
+    tech_keys = [("npv_tech_report", fig_hash, rate, tech) for tech in tech_cf.index]
+
+    col1, col2 = st.columns(2)
+    if col1.button("Generate PDF Report"):
+        submit(report_key, build_npv_report, sections[:1])
+    if col2.button("Generate Technology Reports"):
+        submit_many(build_npv_report, [(key, ([section],)) for key, section in zip(tech_keys, sections[1:])])
+
+    reports = [(report_key, "PDF Report", "npv_irr_report.pdf")]
+    reports += [(key, f"{tech} Report", f"npv_irr_{tech.lower().replace(' ', '_')}_report.pdf")
+                for key, tech in zip(tech_keys, tech_cf.index)]
+    for key, label, file_name in reports:
+        job = get_job(key)
+        if job is None:
+            continue
+        if not job.done():
+            st.info(f"{label} is rendering in the background; it will be ready on the next rerun.")
+        elif job.exception() is not None:
+            st.error(f"{label} generation failed: {job.exception()}")
+        else:
+            st.download_button(
+                label=f"Download {label}",
+                data=job.result(),
+                file_name=file_name,
+                mime="application/pdf",
+                key=f"download_{file_name}"
+            )
 
 if __name__ == "__main__":
     main()
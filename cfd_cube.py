@@ -0,0 +1,150 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_store import CHUNK_ROWS, CSV_PATH, STORE_DIR, ds, ensure_store, iter_cfd, pa
+from memo import memoize
+from profiling import profiled
+
+DIMENSIONS = ["Year", "Technology", "Reference_Type"]
+MEASURES = [
+    "Strike_Price_GBP_Per_MWh",
+    "Price_Spread_Strike_vs_Market",
+    "Price_Spread_Strike_vs_IMRP",
+    "CFD_Generation_MWh",
+    "CFD_Payments_GBP",
+    "Avoided_GHG_tonnes_CO2e",
+    "Subsidy_Rate",
+]
+PARTS = ("count", "sum", "sumsq", "min", "max")
+CUBE_FILE = "_cube.parquet"
+
+_cache = {}
+_lock = threading.Lock()
+
+
+@profiled("aggregate.build_cube")
+def build_cube(df):
+    """Aggregate settlement rows to one row per Year x Technology x Reference_Type cell."""
+    df = df.assign(Subsidy_Rate=df["CFD_Payments_GBP"] / df["CFD_Generation_MWh"])
+    grouped = df.groupby([df[d] for d in DIMENSIONS])[MEASURES]
+    # Count non-null rows per measure so means match pandas' NaN-skipping mean()
+    stats = {
+        "count": grouped.count(),
+        "sum": grouped.sum(),
+        "sumsq": (df[MEASURES] ** 2).groupby([df[d] for d in DIMENSIONS]).sum(),
+        "min": grouped.min(),
+        "max": grouped.max(),
+    }
+    parts = {f"{m}_{part}": stats[part][m] for m in MEASURES for part in PARTS}
+    return pd.DataFrame(parts).reset_index()
+
+
+def merge_cubes(cubes):
+    """Combine partial cubes built from disjoint row sets into one cube."""
+    combined = pd.concat(cubes, ignore_index=True)
+    how = {f"{m}_{part}": part if part in ("min", "max") else "sum" for m in MEASURES for part in PARTS}
+    return combined.groupby(DIMENSIONS, as_index=False).agg(how)
+
+
+@profiled("aggregate.stream_cube")
+def stream_cube(chunk_rows=CHUNK_ROWS, csv_path=CSV_PATH, store_dir=STORE_DIR):
+    """Build the cube chunk by chunk so peak memory follows chunk_rows rather than the file size."""
+    cube = None
+    columns = DIMENSIONS + [m for m in MEASURES if m != "Subsidy_Rate"]
+    for chunk in iter_cfd(columns, chunk_rows, csv_path, store_dir):
+        partial = build_cube(chunk)
+        cube = partial if cube is None else merge_cubes([cube, partial])
+    return cube if cube is not None else build_cube(pd.DataFrame(columns=columns))
+
+
+def _apply_appends(cube, cube_version, manifest, store_dir):
+    """Fold the parts ingested since cube_version into cube; None if the manifest can't bridge the gap."""
+    version, files = cube_version, []
+    for entry in manifest.get("appends", []):
+        if entry["from"] == version:
+            files += entry["files"]
+            version = entry["to"]
+    if version != manifest["sha1"]:
+        return None
+    if not files:
+        return cube
+    columns = DIMENSIONS + [m for m in MEASURES if m != "Subsidy_Rate"]
+    dataset = ds.dataset([os.path.join(store_dir, f) for f in files], format="parquet", partitioning="hive",
+                         partition_base_dir=store_dir)
+    return merge_cubes([cube, build_cube(dataset.to_table(columns=columns).to_pandas())])
+
+
+@profiled("data.load_cube")
+def load_cube(store_dir=STORE_DIR, csv_path=CSV_PATH):
+    """Return the cube for the current store, building and persisting it on first use.
+
+    After an incremental ingest only the newly appended parts are aggregated and merged in.
+    """
+    manifest = ensure_store(csv_path, store_dir)
+    version = manifest["sha1"]
+    with _lock:
+        if version in _cache:
+            return _cache[version]
+
+        path = os.path.join(store_dir, CUBE_FILE)
+        cube_version, cube = next(iter(_cache.items()), (None, None))
+        if cube is None and pa is not None and os.path.exists(path):
+            cube = pd.read_parquet(path)
+            # Cubes persisted before min/max were tracked are rebuilt too
+            if len(cube) and f"{MEASURES[0]}_min" in cube:
+                cube_version = cube["version"].iloc[0]
+                cube = cube.drop(columns="version")
+            else:
+                cube = None
+        if cube is not None and cube_version != version:
+            cube = _apply_appends(cube, cube_version, manifest, store_dir)
+        if cube is None:
+            cube = stream_cube(csv_path=csv_path, store_dir=store_dir)
+        if pa is not None and cube_version != version:
+            cube.assign(version=version).to_parquet(path, index=False)
+
+        _cache.clear()
+        _cache[version] = cube
+        return cube
+
+
+@profiled("aggregate.rollup")
+@memoize("aggregate.rollup")
+def rollup(cube, by, measures, stat="mean", start_year=None, end_year=None, where=None):
+    """Answer a grouped sum/count/mean/var/std/min/max query from cube cells."""
+    if start_year is not None:
+        cube = cube[cube["Year"] >= start_year]
+    if end_year is not None:
+        cube = cube[cube["Year"] <= end_year]
+    for dim, allowed in (where or {}).items():
+        cube = cube[cube[dim].isin(allowed)]
+
+    if isinstance(measures, str):
+        measures = [measures]
+    how = {f"{m}_{part}": part if part in ("min", "max") else "sum" for m in measures for part in PARTS}
+    if by:
+        totals = cube.groupby(by).agg(how)
+    else:
+        totals = cube.agg(how).to_frame().T
+
+    result = pd.DataFrame(index=totals.index)
+    for m in measures:
+        n = totals[f"{m}_count"]
+        s = totals[f"{m}_sum"]
+        if stat == "sum":
+            result[m] = s
+        elif stat == "count":
+            result[m] = n
+        elif stat == "mean":
+            result[m] = s / n.where(n > 0)
+        elif stat in ("var", "std"):
+            var = (totals[f"{m}_sumsq"] - s * s / n.where(n > 0)) / (n - 1).where(n > 1)
+            result[m] = var.clip(lower=0) if stat == "var" else np.sqrt(var.clip(lower=0))
+        elif stat in ("min", "max"):
+            result[m] = totals[f"{m}_{stat}"]
+        else:
+            raise ValueError(f"Unknown stat: {stat}")
+    return result.reset_index() if by else result.reset_index(drop=True)
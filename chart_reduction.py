@@ -0,0 +1,115 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from memo import normalize
+
+HIST_BINS = 50
+MAX_POINTS = 2000
+MAX_CACHED_FIGURES = 128
+
+_figures = OrderedDict()
+_figures_lock = threading.Lock()
+
+
+def histogram_bins(values, nbins=HIST_BINS, range=None):
+    """Counts of values in nbins equal-width bins, as a frame of bin edges, centers and counts."""
+    values = np.asarray(values, dtype=float).ravel()
+    counts, edges = np.histogram(values[np.isfinite(values)], bins=nbins, range=range)
+    return pd.DataFrame({
+        "Bin_Start": edges[:-1],
+        "Bin_End": edges[1:],
+        "Bin_Center": (edges[:-1] + edges[1:]) / 2,
+        "Count": counts
+    })
+
+
+def histogram_figure(values, nbins=HIST_BINS, title=None, name=None):
+    """A histogram drawn from pre-binned counts, so only nbins bars reach the browser."""
+    bins = histogram_bins(values, nbins)
+    fig = go.Figure(go.Bar(x=bins["Bin_Center"], y=bins["Count"], width=bins["Bin_End"] - bins["Bin_Start"],
+                           name=name, customdata=bins[["Bin_Start", "Bin_End"]],
+                           hovertemplate="%{customdata[0]:,.4g} to %{customdata[1]:,.4g}<br>Count: %{y}"
+                                         "<extra></extra>"))
+    fig.update_layout(title=title, bargap=0, showlegend=name is not None)
+    return fig
+
+
+def _numeric(values):
+    values = np.asarray(values)
+    if values.dtype.kind == "M":
+        values = values.view("i8")
+    return values.astype(float)
+
+
+def lttb(x, y, threshold=MAX_POINTS):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps to draw y against sorted x.
+
+    The first and last points are always kept; the rest are split into threshold - 2 buckets and
+    each bucket keeps the point forming the largest triangle with the previous pick and the mean of
+    the next bucket, which preserves peaks and troughs that plain striding would drop.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x, y = _numeric(x), _numeric(y)
+    edges = np.append(np.linspace(1, n - 1, threshold - 1).astype(int), n)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi, after = edges[i], edges[i + 1], edges[i + 2]
+        cx, cy = x[hi:after].mean(), y[hi:after].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def decimate(frame, x, y, by=None, max_points=MAX_POINTS):
+    """Rows of frame LTTB keeps for each line (one per value of the by columns), sorted by x."""
+    frame = frame.sort_values(x, kind="stable")
+    if by is None:
+        return frame.iloc[lttb(frame[x], frame[y], max_points)]
+    parts = [group.iloc[lttb(group[x], group[y], max_points)] for _, group in frame.groupby(by, sort=False)]
+    return pd.concat(parts) if parts else frame
+
+
+def cached_figure(build, *args, **kwargs):
+    """build(*args, **kwargs), reusing the serialized figure when the data and options are unchanged.
+
+    build should be a module-level function so its name identifies it; the key is the content hash
+    of the arguments (see memo.normalize). Each call gets its own Figure, so callers can restyle it freely.
+    """
+    key = hashlib.sha1(repr(normalize((build, args, kwargs))).encode()).hexdigest()
+    with _figures_lock:
+        spec = _figures.get(key)
+        if spec is not None:
+            _figures.move_to_end(key)
+    if spec is None:
+        spec = build(*args, **kwargs).to_json()
+        with _figures_lock:
+            _figures[key] = spec
+            if len(_figures) > MAX_CACHED_FIGURES:
+                _figures.popitem(last=False)
+    return pio.from_json(spec)
+
+
+def tornado_figure(table, x_title, labels=None, scale=1):
+    """Horizontal low/high bars around the base output for a finance.sensitivity table.
+
+    labels maps input names to display names; outputs are multiplied by scale (100 for percentages).
+    """
+    base = table["Base_Output"].iloc[0] * scale
+    y = table["Input"] if labels is None else table["Input"].map(labels)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(y=y, x=table["Low_Output"] * scale - base, base=base, orientation="h", name="Low Case"))
+    fig.add_trace(go.Bar(y=y, x=table["High_Output"] * scale - base, base=base, orientation="h", name="High Case"))
+    fig.add_vline(x=base, line_dash="dash")
+    fig.update_layout(barmode="overlay", yaxis={"autorange": "reversed"}, xaxis_title=x_title, height=400)
+    return fig
@@ -3,32 +3,34 @@ import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 import plotly.express as px
-import gurobipy as gp
-from gurobipy import GRB
-
-def run_gurobi_strategy(cfd_val, ppa_val, merchant_val):
-    try:
-        model = gp.Model()
-        strategies = ["CfD", "PPA", "Merchant"]
-        values = {
-            "CfD": np.random.normal(cfd_val, 5),
-            "PPA": np.random.normal(ppa_val, 8),
-            "Merchant": np.random.normal(merchant_val, 10)
-        }
-
-        x = {s: model.addVar(vtype=GRB.BINARY, name=s) for s in strategies}
-        model.addConstr(gp.quicksum(x[s] for s in strategies) == 1)
-        model.setObjective(gp.quicksum(values[s] * x[s] for s in strategies), GRB.MAXIMIZE)
-        model.optimize()
-
-        selected_strategy = [s for s in strategies if x[s].X > 0.5][0]
-        revenue = values[selected_strategy]
-        return selected_strategy, revenue, values
-
-    except gp.GurobiError as e:
-        st.error(f"Gurobi Error: {e}")
+from allocation_lp import CVAR_ALPHA, YEARS, optimize_allocation, revenue_scenarios, scaling_table
+from scenario_executor import run_scenarios
+from solver_session import default_backend, get_session
+from profiling import profiled, stage
+from sampling import METHODS, required_samples
+from strategy_mc import STRATEGIES, VOLATILITY, tally_kernel
+
+@profiled("optimize.strategy")
+def run_gurobi_strategy(cfd_val, ppa_val, merchant_val, seed=None):
+    strategies = ["CfD", "PPA", "Merchant"]
+    rng = np.random.default_rng(seed)
+    values = {
+        "CfD": rng.normal(cfd_val, 5),
+        "PPA": rng.normal(ppa_val, 8),
+        "Merchant": rng.normal(merchant_val, 10)
+    }
+
+    # The pick-one model is built once per process; each call only swaps the objective
+    session = get_session([np.ones(len(strategies))], ["="])
+    x = session.solve([values[s] for s in strategies], [1])
+    if x is None:
+        st.error(f"Solver Error: {session.backend} found no optimal strategy")
         return None, None, {}
 
+    selected_strategy = strategies[int(np.argmax(x))]
+    revenue = values[selected_strategy]
+    return selected_strategy, revenue, values
+
 def main():
     st.title("Revenue Projection Model")
     st.markdown("This tool simulates expected annual revenue for three offtake strategies under uncertain market conditions.")
@@ -38,33 +40,38 @@ def main():
     cfd_val = st.sidebar.slider("CfD Base Revenue (£m)", 10, 30, 25)
     ppa_val = st.sidebar.slider("PPA Base Revenue (£m)", 10, 30, 18)
     merchant_val = st.sidebar.slider("Merchant Base Revenue (£m)", 10, 30, 20)
+    method = st.sidebar.selectbox("Sampling Method", METHODS,
+                                  help="Antithetic pairs and scrambled Sobol points cut the scenarios needed.")
+    seed = st.sidebar.number_input("Random Seed", 0, 2**31 - 1, 42)
 
-    selected_strategy, revenue, strategy_values = run_gurobi_strategy(cfd_val, ppa_val, merchant_val)
+    selected_strategy, revenue, strategy_values = run_gurobi_strategy(cfd_val, ppa_val, merchant_val, seed)
+    st.sidebar.caption(f"Solver backend: {default_backend()}")
 
     if selected_strategy:
         st.success(f"Optimal Strategy: **{selected_strategy}** with projected revenue of **£{revenue:.2f}m**")
 
-        fig = go.Figure()
-        colors = {"CfD": "royalblue", "PPA": "indianred", "Merchant": "orange"}
-
-        for strategy, value in strategy_values.items():
-            fig.add_trace(go.Indicator(
-                mode="gauge+number",
-                value=value,
-                title={'text': strategy},
-                gauge={
-                    'axis': {'range': [0, max(strategy_values.values()) * 1.2]},
-                    'bar': {'color': colors[strategy]}
-                },
-                domain={'row': 0, 'column': list(strategy_values.keys()).index(strategy)}
-            ))
-
-        fig.update_layout(
-            grid={'rows': 1, 'columns': 3, 'pattern': "independent"},
-            title_text="Revenue Projection by Strategy"
-        )
-
-        st.plotly_chart(fig)
+        with stage("chart.revenue_gauges"):
+            fig = go.Figure()
+            colors = {"CfD": "royalblue", "PPA": "indianred", "Merchant": "orange"}
+
+            for strategy, value in strategy_values.items():
+                fig.add_trace(go.Indicator(
+                    mode="gauge+number",
+                    value=value,
+                    title={'text': strategy},
+                    gauge={
+                        'axis': {'range': [0, max(strategy_values.values()) * 1.2]},
+                        'bar': {'color': colors[strategy]}
+                    },
+                    domain={'row': 0, 'column': list(strategy_values.keys()).index(strategy)}
+                ))
+
+            fig.update_layout(
+                grid={'rows': 1, 'columns': 3, 'pattern': "independent"},
+                title_text="Revenue Projection by Strategy"
+            )
+
+            st.plotly_chart(fig)
 
         # Notes and Insights
         st.markdown("---")
@@ -82,5 +89,84 @@ def main():
         if margin < 1:
             st.warning("⚠️ The revenue difference between top strategies is small. Consider risk, stability, or external factors.")
 
+        # Scenario summary across many draws, sharded over the process pool
+        st.markdown("---")
+        st.subheader("Scenario Summary")
+        n_scenarios = st.slider("Number of Scenarios", 10000, 1000000, 100000, step=10000)
+        tally = run_scenarios(tally_kernel, n_scenarios, ([cfd_val, ppa_val, merchant_val], VOLATILITY, method),
+                              seed=seed)
+        share = tally.count / n_scenarios
+        scenario_df = pd.DataFrame({
+            "Strategy": STRATEGIES,
+            "Selected (%)": 100 * share,
+            "Selected SE (%)": 100 * np.sqrt(share * (1 - share) / n_scenarios),
+            "Mean Revenue When Selected (£m)": tally.mean,
+            "Std Dev (£m)": tally.std
+        })
+        st.dataframe(scenario_df.style.format({
+            "Selected (%)": "{:.1f}",
+            "Selected SE (%)": "{:.2f}",
+            "Mean Revenue When Selected (£m)": "{:.2f}",
+            "Std Dev (£m)": "{:.2f}"
+        }))
+        st.caption("Standard errors assume independent draws; antithetic and Sobol sampling are usually tighter.")
+
+    # Fractional allocation over multi-year revenue scenarios instead of a single pick
+    st.markdown("---")
+    st.subheader("Portfolio Allocation (Scenario LP)")
+    st.markdown("Splits capacity across the three strategies to maximise expected PV minus λ × CVaR of the "
+                "PV shortfall, over correlated multi-year revenue scenarios.")
+    col1, col2, col3 = st.columns(3)
+    lp_scenarios = col1.slider("Revenue Scenarios", 1000, 50000, 5000, step=1000)
+    years = col2.slider("Horizon (years)", 10, 40, YEARS)
+    risk_aversion = col3.slider("Risk Aversion (λ)", 0.0, 10.0, 1.0, step=0.5)
+    col1, col2, col3 = st.columns(3)
+    alpha = col1.select_slider("CVaR Tail", [0.01, 0.05, 0.10, 0.25], value=CVAR_ALPHA,
+                               format_func=lambda a: f"{a:.0%}")
+    min_annual = col2.number_input("Minimum Expected Annual Revenue (£m)", 0.0, 30.0, 0.0, step=0.5)
+    cvar_floor = col3.number_input("Minimum CVaR of PV (£m, 0 = none)", 0.0, 1000.0, 0.0, step=10.0)
+
+    revenues = revenue_scenarios([cfd_val, ppa_val, merchant_val], lp_scenarios, years, seed=seed, method=method)
+    allocation = optimize_allocation(revenues, risk_aversion, alpha, min_annual or None, cvar_floor or None,
+                                     method=method)
+    if allocation is None:
+        st.error("No allocation meets the minimum revenue and CVaR constraints.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Expected PV (£m)", f"{allocation['expected_pv']:,.1f}",
+                    help=f"Standard error £{allocation['pv_stderr']:,.2f}m")
+        col2.metric(f"CVaR {alpha:.0%} of PV (£m)", f"{allocation['cvar_pv']:,.1f}")
+        col3.metric("Build + Solve (s)", f"{allocation['build_seconds'] + allocation['solve_seconds']:.2f}")
+        st.caption(f"{allocation['nonzeros']:,} constraint nonzeros, solved with {allocation['backend']}")
+        target_se = st.number_input("Target PV Standard Error (£m)", 0.01, 10.0, 0.5, step=0.05)
+        st.caption(f"About {required_samples(lp_scenarios, allocation['pv_stderr'], target_se):,} revenue scenarios "
+                   f"({method}) would bring the expected PV's standard error to £{target_se:,.2f}m.")
+
+        with stage("chart.allocation"):
+            weights = pd.DataFrame({"Strategy": list(allocation["weights"]),
+                                    "Share (%)": 100 * np.array(list(allocation["weights"].values()))})
+            fig = px.bar(weights, x="Strategy", y="Share (%)", title="Optimal Capacity Allocation",
+                         color="Strategy", color_discrete_map={"CfD": "royalblue", "PPA": "indianred",
+                                                               "Merchant": "orange"})
+            st.plotly_chart(fig)
+
+            annual = pd.DataFrame({"Year": np.arange(1, years + 1), "Expected Revenue (£m)": allocation["annual_revenue"]})
+            fig = px.line(annual, x="Year", y="Expected Revenue (£m)", title="Expected Annual Revenue of the Allocation")
+            if min_annual:
+                fig.add_hline(y=min_annual, line_dash="dash", annotation_text="Minimum")
+            st.plotly_chart(fig)
+
+    with st.expander("Solver Scaling"):
+        st.markdown("Build and solve time of the allocation LP as the number of scenarios grows.")
+        if st.button("Time Scenario Counts"):
+            timings = scaling_table([cfd_val, ppa_val, merchant_val], years=years, risk_aversion=risk_aversion,
+                                    alpha=alpha)
+            st.dataframe(timings.style.format({"Nonzeros": "{:,}", "Build (s)": "{:.3f}", "Solve (s)": "{:.3f}",
+                                               "Total (s)": "{:.3f}"}))
+            with stage("chart.lp_scaling"):
+                fig = px.line(timings, x="Scenarios", y=["Build (s)", "Solve (s)"], markers=True,
+                              title="LP Time vs Scenario Count", labels={"value": "Seconds", "variable": "Phase"})
+                st.plotly_chart(fig)
+
 if __name__ == "__main__":
     main()
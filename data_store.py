@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import pandas as pd
+
+from profiling import profiled
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # fall back to plain CSV reads
+    pa = ds = pq = None
+
+CSV_PATH = "data/cfd_processed.csv"
+STORE_DIR = "data/cfd_store"
+MANIFEST_FILE = "_manifest.json"
+CHUNK_ROWS = 500_000
+TAIL_BYTES = 1 << 16
+MAX_APPENDS = 90
+
+DEFAULT_START = "2025-01-01"
+DEFAULT_END = "2060-12-31"
+
+_lock = threading.Lock()
+_source_cache = {}
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _tail_hash(path, end):
+    """Hash of the TAIL_BYTES ending at offset end, used to check a file only grew since then."""
+    start = max(0, end - TAIL_BYTES)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha1(f.read(end - start)).hexdigest()
+
+
+def _read_manifest(store_dir=STORE_DIR):
+    try:
+        with open(os.path.join(store_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(manifest, store_dir=STORE_DIR):
+    tmp_path = os.path.join(store_dir, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_FILE))
+
+
+def _build_store(csv_path, store_dir, source, chunk_rows=CHUNK_ROWS):
+    # Write into a scratch directory and swap it in so readers never see a half-built store
+    tmp_dir = f"{store_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    rows, columns, watermark = 0, None, None
+    # Convert chunk by chunk so the source never has to fit in memory
+    for i, df in enumerate(pd.read_csv(csv_path, parse_dates=["Settlement_Date"], chunksize=chunk_rows)):
+        df["Year"] = df["Settlement_Date"].dt.year
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_to_dataset(table, tmp_dir, partition_cols=["Year"], basename_template=f"part-{i}-{{i}}.parquet")
+        rows += len(df)
+        columns = list(df.columns)
+        if len(df):
+            latest = df["Settlement_Date"].max()
+            watermark = latest if watermark is None else max(watermark, latest)
+    _write_manifest({
+        **source,
+        "rows": rows,
+        "columns": columns,
+        "watermark": None if watermark is None else watermark.isoformat(),
+        "tail_sha1": _tail_hash(csv_path, source["size"]),
+        "appends": []
+    }, tmp_dir)
+
+    old_dir = f"{store_dir}.old-{os.getpid()}"
+    if os.path.exists(store_dir):
+        os.replace(store_dir, old_dir)
+    os.replace(tmp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _append_store(csv_path, store_dir, manifest, source, chunk_rows=CHUNK_ROWS):
+    """Write the rows appended to the CSV since manifest was taken as new Parquet parts.
+
+    Returns the updated manifest, or None when the new rows do not all fall after the watermark and
+    the store has to be rebuilt instead. Parts are staged and only moved into store_dir once every
+    chunk has passed, so readers scanning the store never see rows the manifest doesn't list.
+    """
+    names = [c for c in manifest["columns"] if c != "Year"]
+    watermark = pd.Timestamp(manifest["watermark"])
+    stage_dir = f"{store_dir}.append-{os.getpid()}"
+    shutil.rmtree(stage_dir, ignore_errors=True)
+    files, rows, latest = [], 0, watermark
+    try:
+        with open(csv_path, "rb") as f:
+            f.seek(manifest["size"])
+            reader = pd.read_csv(f, header=None, names=names, parse_dates=["Settlement_Date"], chunksize=chunk_rows)
+            for i, df in enumerate(reader):
+                if (df["Settlement_Date"] <= watermark).any():
+                    return None
+                df["Year"] = df["Settlement_Date"].dt.year
+                pq.write_to_dataset(pa.Table.from_pandas(df, preserve_index=False), stage_dir, partition_cols=["Year"],
+                                    basename_template=f"part-{source['sha1'][:12]}-{i}-{{i}}.parquet",
+                                    file_visitor=lambda written: files.append(os.path.relpath(written.path, stage_dir)))
+                rows += len(df)
+                latest = max(latest, df["Settlement_Date"].max())
+        for name in files:
+            os.makedirs(os.path.dirname(os.path.join(store_dir, name)), exist_ok=True)
+            os.replace(os.path.join(stage_dir, name), os.path.join(store_dir, name))
+    finally:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+
+    appends = manifest.get("appends", []) + [{"from": manifest["sha1"], "to": source["sha1"], "files": files}]
+    return {
+        **manifest,
+        **source,
+        "rows": manifest["rows"] + rows,
+        "watermark": latest.isoformat(),
+        "tail_sha1": _tail_hash(csv_path, source["size"]),
+        "appends": appends[-MAX_APPENDS:]
+    }
+
+
+def ensure_store(csv_path=CSV_PATH, store_dir=STORE_DIR):
+    """Convert the settlement CSV into a year-partitioned Parquet store when the source has changed.
+
+    Rows appended to the CSV after the store's watermark are added as new Parquet parts and listed
+    under the manifest's "appends"; anything else rebuilds the store. Returns the store manifest, whose
+    "sha1" identifies the current data version.
+    """
+    stat = os.stat(csv_path)
+    with _lock:
+        manifest = _read_manifest(store_dir) if pa is not None else _source_cache.get(csv_path)
+        if manifest and manifest["size"] == stat.st_size and manifest["mtime"] == stat.st_mtime:
+            return manifest
+
+        # mtime moved but the bytes may not have (touch, re-copy): compare content hashes first
+        source = {"size": stat.st_size, "mtime": stat.st_mtime, "sha1": _file_hash(csv_path)}
+        if pa is None:
+            # No columnar store without pyarrow; still track the source version for callers
+            _source_cache[csv_path] = source
+            return source
+        if manifest and manifest.get("sha1") == source["sha1"]:
+            manifest.update(source)
+            _write_manifest(manifest, store_dir)
+            return manifest
+
+        # Grown in place with the old bytes untouched: ingest only the new tail
+        if (manifest and manifest.get("watermark") and stat.st_size > manifest["size"]
+                and manifest.get("tail_sha1") == _tail_hash(csv_path, manifest["size"])):
+            appended = _append_store(csv_path, store_dir, manifest, source)
+            if appended is not None:
+                _write_manifest(appended, store_dir)
+                return appended
+
+        _build_store(csv_path, store_dir, source)
+        return _read_manifest(store_dir)
+
+
+def _date_filter(start, end):
+    expr = None
+    if start is not None:
+        start = pd.Timestamp(start)
+        expr = (ds.field("Year") >= start.year) & (ds.field("Settlement_Date") >= start.to_pydatetime())
+    if end is not None:
+        end = pd.Timestamp(end)
+        upper = (ds.field("Year") <= end.year) & (ds.field("Settlement_Date") <= end.to_pydatetime())
+        expr = upper if expr is None else expr & upper
+    return expr
+
+
+@profiled("data.load_cfd")
+def load_cfd(columns=None, start=None, end=None, csv_path=CSV_PATH, store_dir=STORE_DIR):
+    """Read settlement rows between start and end (inclusive), loading only the requested columns."""
+    if pa is None:
+        ensure_store(csv_path, store_dir)
+        df = pd.read_csv(csv_path, parse_dates=["Settlement_Date"])
+        if start is not None:
+            df = df[df["Settlement_Date"] >= start]
+        if end is not None:
+            df = df[df["Settlement_Date"] <= end]
+        if columns is not None:
+            df = df.assign(Year=df["Settlement_Date"].dt.year)[columns]
+        return df
+
+    ensure_store(csv_path, store_dir)
+    dataset = ds.dataset(store_dir, format="parquet", partitioning="hive")
+    table = dataset.to_table(columns=columns, filter=_date_filter(start, end))
+    return table.to_pandas()
+
+
+def iter_cfd(columns=None, chunk_rows=CHUNK_ROWS, csv_path=CSV_PATH, store_dir=STORE_DIR):
+    """Yield settlement rows as DataFrames of about chunk_rows rows, holding one chunk in memory at a time."""
+    ensure_store(csv_path, store_dir)
+    if pa is None:
+        for df in pd.read_csv(csv_path, parse_dates=["Settlement_Date"], chunksize=chunk_rows):
+            if columns is not None:
+                df = df.assign(Year=df["Settlement_Date"].dt.year)[columns]
+            yield df
+        return
+
+    dataset = ds.dataset(store_dir, format="parquet", partitioning="hive")
+    # Batches come per file, so coalesce the small ones (one per Year partition) up to chunk_rows
+    pending, pending_rows = [], 0
+    for batch in dataset.to_batches(columns=columns, batch_size=chunk_rows):
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows >= chunk_rows:
+            yield pa.Table.from_batches(pending).to_pandas()
+            pending, pending_rows = [], 0
+    if pending_rows:
+        yield pa.Table.from_batches(pending).to_pandas()
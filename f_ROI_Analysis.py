@@ -2,6 +2,32 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+from cfd_cube import load_cube, rollup
+import numpy as np
+from finance import ASSET_COLUMNS, SENSITIVITY_STEP, asset_problems, portfolio_roi, sensitivity
+from profiling import stage
+from chart_reduction import tornado_figure
+
+START_YEAR, END_YEAR = 2025, 2060
+
+SENSITIVITY_INPUTS = {
+    "CapEx_GBP_Per_MW": "CapEx (£/MW)",
+    "Capacity_MW": "Installed Capacity (MW)",
+    "OM_Cost_GBP_Per_MWh": "O&M Cost (£/MWh)",
+    "Degradation_Rate": "Degradation Rate",
+    "Asset_Life_Years": "Project Lifetime (Years)"
+}
+
+def portfolio_roi_cases(cases, prices, annual_gen):
+    """Combined ROI of one asset per reference type for every row of cases, in one portfolio_roi call."""
+    n, k = len(cases), len(prices)
+    assets = cases.loc[cases.index.repeat(k)].reset_index(drop=True).assign(
+        Reference_Type=np.tile(prices.index, n),
+        Annual_Generation_MWh=annual_gen
+    )
+    result = portfolio_roi(assets, prices)
+    totals = result.groupby(np.repeat(np.arange(n), k))[["Revenue", "Cost"]].sum()
+    return ((totals["Revenue"] - totals["Cost"]) / totals["Cost"]).to_numpy()
 
 # Theme detection
 # Removed manual override for theme. Let Streamlit handle background/foreground color automatically.
@@ -14,8 +40,8 @@ def main():
     st.markdown("- Reference market pricing")
     st.markdown("Adjust inputs in the sidebar to simulate different investment scenarios.")
 
-    df = pd.read_csv("data/cfd_processed.csv", parse_dates=["Settlement_Date"])
-    df = df[(df["Settlement_Date"] >= "2025-01-01") & (df["Settlement_Date"] <= "2060-12-31")]
+    cube = load_cube()
+    cube = cube[(cube["Year"] >= START_YEAR) & (cube["Year"] <= END_YEAR)]
 
     # Sidebar Inputs
     capex_per_mw = st.sidebar.number_input("CapEx (£/MW)", 500000, 3000000, 1000000, step=100000)
@@ -25,74 +51,97 @@ def main():
     asset_life = st.sidebar.slider("Project Lifetime (Years)", 5, 40, 25)
 
     # Base values
-    project_cost = capex_per_mw * capacity_mw
-    annual_gen = df["CFD_Generation_MWh"].mean()
-
-    def discounted_output(year):
-        return annual_gen * ((1 - degradation_rate) ** (year - 1))
-
-    # Simulation
-    sim_data = []
-    for ref in df["Reference_Type"].unique():
-        total_revenue = 0
-        total_cost = project_cost
-        for year in range(1, asset_life + 1):
-            avg_price = df[df["Reference_Type"] == ref]["Strike_Price_GBP_Per_MWh"].mean()
-            output = discounted_output(year)
-            rev = avg_price * output
-            om_cost = om_cost_per_mwh * output
-            total_revenue += rev
-            total_cost += om_cost
-        roi = (total_revenue - total_cost) / total_cost
-        sim_data.append({"Reference_Type": ref, "Revenue": total_revenue, "Cost": total_cost, "ROI": roi})
-
-    result_df = pd.DataFrame(sim_data)
+    annual_gen = rollup(cube, None, "CFD_Generation_MWh")["CFD_Generation_MWh"].iloc[0]
+    strike_by_ref = rollup(cube, ["Reference_Type"], "Strike_Price_GBP_Per_MWh")
+    prices = strike_by_ref.set_index("Reference_Type")["Strike_Price_GBP_Per_MWh"]
+
+    # One hypothetical asset per reference type, evaluated in closed form
+    assets = pd.DataFrame({
+        "Reference_Type": prices.index,
+        "Capacity_MW": capacity_mw,
+        "CapEx_GBP_Per_MW": capex_per_mw,
+        "OM_Cost_GBP_Per_MWh": om_cost_per_mwh,
+        "Degradation_Rate": degradation_rate,
+        "Asset_Life_Years": asset_life,
+        "Annual_Generation_MWh": annual_gen
+    })
+    result_df = portfolio_roi(assets, prices)[["Reference_Type", "Revenue", "Cost", "ROI"]]
     result_df["ROI_Label"] = result_df["ROI"].apply(lambda x: f"{x:.1%}")
 
     # Donut: Total Revenue
     st.subheader("Total Revenue Over Project Lifetime")
     st.markdown("Gross energy revenue over the life of the asset, factoring in output degradation.")
 
-    fig1 = go.Figure()
-    colors = ["#1f77b4", "#ff7f0e", "#2ca02c"]
-    for i, row in result_df.iterrows():
-        fig1.add_trace(go.Indicator(
-            mode="gauge+number",
-            value=row["Revenue"] / 1e6,
-            title={"text": f"<b>{row['Reference_Type']}</b><br><sub>£m</sub>", "font": {"size": 22}},
-            domain={"x": [i * 0.33, (i + 1) * 0.33], "y": [0, 1]},
-            number={"font": {"size": 48}, "valueformat": ".2f"},
-            gauge={
-                "axis": {"range": [0, max(result_df['Revenue']) / 1e6 * 1.2], "tickwidth": 1, "tickcolor": "gray"},
-                "bar": {"color": colors[i % len(colors)]},
-                "bgcolor": "black",
-                "borderwidth": 2,
-                "bordercolor": "white"
-            }
-        ))
-    fig1.update_layout(height=500, margin=dict(t=20, b=20))
-    st.plotly_chart(fig1)
+    with stage("chart.revenue_gauges"):
+        fig1 = go.Figure()
+        colors = ["#1f77b4", "#ff7f0e", "#2ca02c"]
+        for i, row in result_df.iterrows():
+            fig1.add_trace(go.Indicator(
+                mode="gauge+number",
+                value=row["Revenue"] / 1e6,
+                title={"text": f"<b>{row['Reference_Type']}</b><br><sub>£m</sub>", "font": {"size": 22}},
+                domain={"x": [i * 0.33, (i + 1) * 0.33], "y": [0, 1]},
+                number={"font": {"size": 48}, "valueformat": ".2f"},
+                gauge={
+                    "axis": {"range": [0, max(result_df['Revenue']) / 1e6 * 1.2], "tickwidth": 1, "tickcolor": "gray"},
+                    "bar": {"color": colors[i % len(colors)]},
+                    "bgcolor": "black",
+                    "borderwidth": 2,
+                    "bordercolor": "white"
+                }
+            ))
+        fig1.update_layout(height=500, margin=dict(t=20, b=20))
+        st.plotly_chart(fig1)
 
     # ROI donut-style (ENLARGED)
     st.subheader("ROI by Reference Type")
-    fig2 = go.Figure()
-    for i, row in result_df.iterrows():
-        fig2.add_trace(go.Indicator(
-            mode="gauge+number",
-            value=row["ROI"] * 100,
-            title={"text": f"<b>{row['Reference_Type']}</b><br><sub>ROI %</sub>", "font": {"size": 22}},
-            domain={"x": [i * 0.33, (i + 1) * 0.33], "y": [0, 1]},
-            number={"font": {"size": 48}, "valueformat": ".1f"},
-            gauge={
-                "axis": {"range": [-100, 100], "tickwidth": 1, "tickcolor": "gray"},
-                "bar": {"color": colors[i % len(colors)]},
-                "bgcolor": "black",
-                "borderwidth": 2,
-                "bordercolor": "white"
-            }
-        ))
-    fig2.update_layout(height=500, margin=dict(t=20, b=20))
-    st.plotly_chart(fig2)
+    with stage("chart.roi_gauges"):
+        fig2 = go.Figure()
+        for i, row in result_df.iterrows():
+            fig2.add_trace(go.Indicator(
+                mode="gauge+number",
+                value=row["ROI"] * 100,
+                title={"text": f"<b>{row['Reference_Type']}</b><br><sub>ROI %</sub>", "font": {"size": 22}},
+                domain={"x": [i * 0.33, (i + 1) * 0.33], "y": [0, 1]},
+                number={"font": {"size": 48}, "valueformat": ".1f"},
+                gauge={
+                    "axis": {"range": [-100, 100], "tickwidth": 1, "tickcolor": "gray"},
+                    "bar": {"color": colors[i % len(colors)]},
+                    "bgcolor": "black",
+                    "borderwidth": 2,
+                    "bordercolor": "white"
+                }
+            ))
+        fig2.update_layout(height=500, margin=dict(t=20, b=20))
+        st.plotly_chart(fig2)
+
+    # Sensitivity: every input moved down and up, all cases evaluated together
+    st.subheader("ROI Sensitivity")
+    step = st.slider("Perturbation (± %)", 1, 50, int(SENSITIVITY_STEP * 100), key="roi_sensitivity_step") / 100
+    base_inputs = {
+        "CapEx_GBP_Per_MW": capex_per_mw,
+        "Capacity_MW": capacity_mw,
+        "OM_Cost_GBP_Per_MWh": om_cost_per_mwh,
+        "Degradation_Rate": degradation_rate,
+        "Asset_Life_Years": asset_life
+    }
+    # O&M and degradation can sit at zero, so they move by the step's share of their input range instead
+    spans = {"OM_Cost_GBP_Per_MWh": step * 100, "Degradation_Rate": step * 0.05}
+    tornado = sensitivity(lambda cases: portfolio_roi_cases(cases, prices, annual_gen), base_inputs, step,
+                          spans=spans, whole=("Asset_Life_Years",), floor=0)
+    with stage("chart.roi_tornado"):
+        fig3 = tornado_figure(tornado, "Portfolio ROI (%)", SENSITIVITY_INPUTS, scale=100)
+        st.plotly_chart(fig3)
+    st.dataframe(tornado.assign(Input=tornado["Input"].map(SENSITIVITY_INPUTS))[
+        ["Input", "Low_Value", "High_Value", "Low_Output", "High_Output", "Swing", "Elasticity"]].style.format({
+            "Low_Value": "{:,.4g}", "High_Value": "{:,.4g}", "Low_Output": "{:.1%}", "High_Output": "{:.1%}",
+            "Swing": "{:.1%}", "Elasticity": "{:+.2f}"
+        }, na_rep="—"), hide_index=True)
+    top = tornado.iloc[0]
+    st.caption(f"💡 {SENSITIVITY_INPUTS[top['Input']]} moves portfolio ROI the most: "
+               f"{top['Low_Output']:.1%} to {top['High_Output']:.1%} between its low and high cases. Inputs move "
+               f"±{step:.0%} (O&M and degradation by ±{step:.0%} of their range; lifetime to whole years). "
+               "Elasticity is the % change in ROI per 1% change in the input.")
 
     # Insights and Findings
     st.markdown("---")
@@ -103,5 +152,28 @@ def main():
     st.markdown(f"- **{worst_roi['Reference_Type']}** had the lowest ROI at **{worst_roi['ROI_Label']}**.")
     st.markdown("This suggests the impact of market price assumptions and operational costs are substantial on financial returns across reference types.")
 
+    # Portfolio mode
+    st.markdown("---")
+    st.subheader("Portfolio ROI")
+    st.markdown(f"Upload a CSV with one row per asset and columns {', '.join(ASSET_COLUMNS)} "
+                "plus Reference_Type (priced at its average strike) or Price_GBP_Per_MWh.")
+    upload = st.file_uploader("Asset Portfolio (CSV)", type="csv")
+    if upload is not None:
+        try:
+            assets = pd.read_csv(upload)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError) as exc:
+            st.error(f"Could not read the portfolio CSV: {exc}")
+            return
+        problems = asset_problems(assets, prices)
+        if problems:
+            st.error("The portfolio CSV can't be priced. " + "; ".join(problems) + ".")
+            return
+        portfolio = portfolio_roi(assets, prices)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Assets", f"{len(portfolio):,}")
+        col2.metric("Portfolio ROI", f"{(portfolio['Revenue'].sum() - portfolio['Cost'].sum()) / portfolio['Cost'].sum():.1%}")
+        col3.metric("Median Asset ROI", f"{portfolio['ROI'].median():.1%}")
+        st.dataframe(portfolio)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+
+from memo import memoize
+from profiling import profiled
+
+ASSET_COLUMNS = [
+    "Capacity_MW",
+    "CapEx_GBP_Per_MW",
+    "OM_Cost_GBP_Per_MWh",
+    "Degradation_Rate",
+    "Asset_Life_Years",
+    "Annual_Generation_MWh",
+]
+
+
+def degradation_factor(degradation_rate, asset_life):
+    """Sum of (1 - d)^(year - 1) over years 1..life, i.e. lifetime output per unit of first-year output."""
+    d = np.asarray(degradation_rate, dtype=float)
+    life = np.asarray(asset_life, dtype=float)
+    safe_d = np.where(d > 0, d, 1.0)
+    return np.where(d > 0, (1 - (1 - d) ** life) / safe_d, life)
+
+
+def yearly_output(assets):
+    """Asset x year matrix of degraded output, zero after each asset's lifetime."""
+    life = assets["Asset_Life_Years"].to_numpy(dtype=int)
+    years = np.arange(life.max())
+    decay = (1 - assets["Degradation_Rate"].to_numpy(dtype=float))[:, None] ** years
+    output = assets["Annual_Generation_MWh"].to_numpy(dtype=float)[:, None] * decay
+    return np.where(years < life[:, None], output, 0.0)
+
+
+def asset_problems(assets, prices=None):
+    """What keeps portfolio_roi from pricing assets: missing or non-numeric columns, unpriced reference types."""
+    required = list(ASSET_COLUMNS)
+    if "Price_GBP_Per_MWh" in assets:
+        required.append("Price_GBP_Per_MWh")
+    problems = []
+    missing = [c for c in required if c not in assets]
+    if "Price_GBP_Per_MWh" not in assets and "Reference_Type" not in assets:
+        missing.append("Reference_Type or Price_GBP_Per_MWh")
+    if missing:
+        problems.append(f"Missing columns: {', '.join(missing)}")
+    non_numeric = [c for c in required if c in assets and not pd.api.types.is_numeric_dtype(assets[c])]
+    if non_numeric:
+        problems.append(f"Non-numeric columns: {', '.join(non_numeric)}")
+    if "Price_GBP_Per_MWh" not in assets and "Reference_Type" in assets and prices is not None:
+        unpriced = sorted(set(assets["Reference_Type"].dropna().astype(str)) - set(prices.index))
+        if unpriced:
+            problems.append(f"No price for Reference_Type {', '.join(unpriced)}")
+    return problems
+
+
+@profiled("finance.portfolio_roi")
+@memoize("finance.portfolio_roi")
+def portfolio_roi(assets, prices=None):
+    """Lifetime revenue, cost and ROI for every asset (row) at once.
+
+    Each asset needs the ASSET_COLUMNS plus either Price_GBP_Per_MWh or a Reference_Type
+    that is looked up in `prices` (a Series indexed by reference type).
+    """
+    if "Price_GBP_Per_MWh" in assets:
+        price = assets["Price_GBP_Per_MWh"].to_numpy(dtype=float)
+    else:
+        price = assets["Reference_Type"].map(prices).to_numpy(dtype=float)
+
+    lifetime_output = assets["Annual_Generation_MWh"].to_numpy(dtype=float) * degradation_factor(
+        assets["Degradation_Rate"], assets["Asset_Life_Years"])
+    revenue = price * lifetime_output
+    cost = (assets["CapEx_GBP_Per_MW"].to_numpy(dtype=float) * assets["Capacity_MW"].to_numpy(dtype=float)
+            + assets["OM_Cost_GBP_Per_MWh"].to_numpy(dtype=float) * lifetime_output)
+    return assets.assign(
+        Lifetime_Output_MWh=lifetime_output,
+        Revenue=revenue,
+        Cost=cost,
+        ROI=(revenue - cost) / cost
+    )
+
+
+def discount_factors(rates, periods):
+    """(rates, periods) matrix of 1 / (1 + r)^t for t = 0..periods-1."""
+    rates = np.atleast_1d(np.asarray(rates, dtype=float))
+    with np.errstate(over="ignore", divide="ignore"):
+        return (1 + rates[:, None]) ** -np.arange(periods)
+
+
+def npv(cashflows, rates):
+    """NPV of each cashflow row at each rate, with the first cashflow undiscounted.
+
+    Returns shape (rows, rates); a 1-D cashflow vector or a scalar rate drops that axis.
+    """
+    cf = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    values = cf @ discount_factors(rates, cf.shape[1]).T
+    if np.ndim(rates) == 0:
+        values = values[:, 0]
+    return values[0] if np.ndim(cashflows) == 1 else values
+
+
+@profiled("finance.npv_curve")
+@memoize("finance.npv_curve")
+def npv_curve(cashflows, rates):
+    """NPV of each cashflow row across a sweep of rates, shape (rows, len(rates))."""
+    return npv(np.atleast_2d(cashflows), np.atleast_1d(rates))
+
+
+def _row_npv(cf, rates):
+    t = np.arange(cf.shape[1])
+    factors = (1 + rates[:, None]) ** -t
+    value = (cf * factors).sum(axis=1)
+    slope = -(cf * t * factors / (1 + rates[:, None])).sum(axis=1)
+    return value, slope
+
+
+IRR_GRID = np.unique(np.concatenate([np.linspace(-0.9, 1, 191), np.linspace(1, 10, 91)]))
+
+
+@profiled("finance.irr")
+@memoize("finance.irr")
+def irr(cashflows, tol=1e-10, max_iter=100):
+    """IRR of each cashflow row; NaN where NPV never changes sign on (-90%, 1000%].
+
+    Every row is bracketed on a coarse rate grid (taking the sign change nearest 0% when there
+    are several) and then refined with Newton steps, falling back to bisection whenever a step
+    leaves the bracket.
+    """
+    cf = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        grid_npv = npv(cf, IRR_GRID)
+        sign_change = np.signbit(grid_npv[:, :-1]) != np.signbit(grid_npv[:, 1:])
+        sign_change &= np.isfinite(grid_npv[:, :-1]) & np.isfinite(grid_npv[:, 1:])
+        found = sign_change.any(axis=1)
+        distance = np.where(sign_change, np.abs(IRR_GRID[:-1]), np.inf)
+        k = np.argmin(distance, axis=1)
+        lo, hi = IRR_GRID[k], IRR_GRID[k + 1]
+        f_lo = grid_npv[np.arange(len(cf)), k]
+
+        scale = np.abs(cf).max(axis=1)
+        rate = (lo + hi) / 2
+        for _ in range(max_iter):
+            value, slope = _row_npv(cf, rate)
+            done = ~found | (np.abs(value) <= tol * scale) | (hi - lo < tol)
+            if done.all():
+                break
+            # Shrink the bracket around the root, then try a Newton step inside it
+            below = np.signbit(value) == np.signbit(f_lo)
+            lo = np.where(below, rate, lo)
+            f_lo = np.where(below, value, f_lo)
+            hi = np.where(below, hi, rate)
+            newton = rate - value / slope
+            inside = np.isfinite(newton) & (newton > lo) & (newton < hi)
+            rate = np.where(done, rate, np.where(inside, newton, (lo + hi) / 2))
+
+    result = np.where(found, rate, np.nan)
+    return result[0] if np.ndim(cashflows) == 1 else result
+
+
+@memoize("finance.discounted_payback")
+def discounted_payback(cashflows, rate):
+    """Index of the first period where cumulative discounted cashflow is >= 0, or -1 if never."""
+    cf = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    cumulative = np.cumsum(cf * discount_factors(rate, cf.shape[1]), axis=1)
+    reached = cumulative >= 0
+    result = np.where(reached.any(axis=1), np.argmax(reached, axis=1), -1)
+    return result[0] if np.ndim(cashflows) == 1 else result
+
+
+SENSITIVITY_STEP = 0.10
+
+
+def sensitivity(evaluate, base, step=SENSITIVITY_STEP, spans=None, whole=(), floor=None):
+    """Tornado table for evaluate's output with every input in base moved down and up.
+
+    Inputs move by the fraction step of their base value, or by the absolute amount in spans (for
+    inputs that can sit at zero, where a relative step would not move them). Inputs named in whole
+    are moved outward to whole numbers, and low cases are clipped at floor. An input at zero with no
+    span can't be moved and is flagged with Perturbed = False.
+
+    evaluate maps a frame of cases (one column per input) to one output per case; the base case and
+    all 2 x len(base) perturbed cases go through it in a single batched call. Elasticity is the arc
+    elasticity across the low and high cases (% change in output per % change in input), relative to
+    |base output| so its sign is the direction of the effect. Rows are sorted by swing, largest first.
+    """
+    spans = spans or {}
+    names = list(base)
+    values = np.array([base[n] for n in names], dtype=float)
+    k = len(names)
+    delta = np.array([spans[n] if n in spans else abs(base[n]) * step for n in names], dtype=float)
+    low_values, high_values = values - delta, values + delta
+    rounded = np.isin(names, list(whole))
+    low_values = np.where(rounded, np.floor(low_values), low_values)
+    high_values = np.where(rounded, np.ceil(high_values), high_values)
+    if floor is not None:
+        low_values = np.maximum(low_values, floor)
+
+    cases = np.tile(values, (1 + 2 * k, 1))
+    low_rows = 1 + 2 * np.arange(k)
+    cases[low_rows, np.arange(k)] = low_values
+    cases[low_rows + 1, np.arange(k)] = high_values
+
+    outputs = np.asarray(evaluate(pd.DataFrame(cases, columns=names)), dtype=float)
+    base_output, low, high = outputs[0], outputs[low_rows], outputs[low_rows + 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        elasticity = ((high - low) / abs(base_output)) / ((high_values - low_values) / np.abs(values))
+    table = pd.DataFrame({
+        "Input": names,
+        "Base_Value": values,
+        "Low_Value": low_values,
+        "High_Value": high_values,
+        "Base_Output": base_output,
+        "Low_Output": low,
+        "High_Output": high,
+        "Swing": np.abs(high - low),
+        # Undefined around a zero base value, where any move is an infinite relative change
+        "Elasticity": np.where(np.isfinite(elasticity) & (values != 0), elasticity, np.nan),
+        "Perturbed": high_values > low_values
+    })
+    return table.sort_values("Swing", ascending=False, ignore_index=True)
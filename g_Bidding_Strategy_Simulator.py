@@ -3,6 +3,11 @@ import numpy as np
 import pandas as pd
 import plotly.express as px
 import io
+from bidding import BIDS, CVAR_ALPHA, PRICE_VOLATILITY, bid_curve, optimal_bid, price_kernel
+from scenario_executor import run_scenarios
+from profiling import stage
+from sampling import METHODS, estimate, required_samples
+from chart_reduction import cached_figure, histogram_figure
 
 def main():
     st.title("Bidding Strategy Simulator")
@@ -13,36 +18,50 @@ def main():
     bid_price = st.sidebar.slider("Bid Strike Price (£/MWh)", 30, 150, 80, step=5)
     market_price = st.sidebar.slider("Expected Market Price (£/MWh)", 30, 100, 60)
     generation = st.sidebar.number_input("Annual Generation (MWh)", 10000, 1000000, 300000, step=10000)
+    method = st.sidebar.selectbox("Sampling Method", METHODS, help="Antithetic pairs and scrambled Sobol "
+                                  "points give steadier histograms than plain pseudo-random draws.")
+    seed = st.sidebar.number_input("Random Seed", 0, 2**31 - 1, 42)
 
-    # Simulated price scenarios
-    prices = np.random.normal(loc=market_price, scale=8, size=1000)
+    # Simulated price scenarios for the distribution chart; the statistics below are exact
+    prices = run_scenarios(price_kernel, 1000, (market_price, PRICE_VOLATILITY, method), seed=seed)
     diff = bid_price - prices
     revenue = diff * generation
     revenue[revenue < 0] = 0  # No award below market
+    stats = bid_curve([bid_price], market_price, generation).iloc[0]
 
     # Chart
     st.subheader("Simulated Revenue Distribution")
-    fig = px.histogram(revenue, nbins=50, title="Revenue from CfD Bid", labels={"value": "Annual Revenue (£)"})
-    fig.update_layout(xaxis_title="Annual Revenue (£)", yaxis_title="Frequency", height=450)
-    st.plotly_chart(fig)
+    with stage("chart.revenue_histogram"):
+        # Bin on the server so the browser gets 50 bars rather than every sample
+        fig = cached_figure(histogram_figure, revenue, 50, title="Revenue from CfD Bid")
+        fig.update_layout(xaxis_title="Annual Revenue (£)", yaxis_title="Frequency", height=450)
+        st.plotly_chart(fig)
+    mean, stderr = estimate(revenue, method)
+    cv_mean, cv_stderr = estimate(revenue, method, control=prices, control_mean=market_price)
+    st.caption(f"Simulated mean £{mean:,.0f} ± £{stderr:,.0f} (SE); with the price as a control variate "
+               f"£{cv_mean:,.0f} ± £{cv_stderr:,.0f}. Exact mean £{stats['Expected_Revenue']:,.0f}.")
+    target_pct = st.number_input("Target Standard Error (% of mean)", 0.1, 10.0, 1.0, step=0.1)
+    if mean > 0:
+        target = mean * target_pct / 100
+        st.caption(f"About {required_samples(len(revenue), stderr, target):,} {method} draws would bring the SE to "
+                   f"£{target:,.0f}; {required_samples(len(revenue), cv_stderr, target):,} with the control variate.")
 
     # Key stats
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Mean (£)", f"{revenue.mean():,.0f}")
-    col2.metric("P10 (£)", f"{np.percentile(revenue, 10):,.0f}")
-    col3.metric("P90 (£)", f"{np.percentile(revenue, 90):,.0f}")
+    col1.metric("Mean (£)", f"{stats['Expected_Revenue']:,.0f}")
+    col2.metric("P10 (£)", f"{stats['P10_Revenue']:,.0f}")
+    col3.metric("P90 (£)", f"{stats['P90_Revenue']:,.0f}")
 
-    # Improved win probability based on simulation
-    win_prob = np.mean(prices <= bid_price) * 100  # Probability bid price >= market price (win)
-    win_prob = round(win_prob, 1)
+    # Probability bid price >= market price (win)
+    win_prob = round(stats["Win_Probability"] * 100, 1)
     col4.metric("Win Probability", f"{win_prob}%")
 
     # Summary Table
     summary_df = pd.DataFrame({
         "Metric": ["Mean Revenue (£)", "P10 Revenue (£)", "P90 Revenue (£)", "Win Probability (%)"],
-        "Value": [f"{revenue.mean():,.0f}",
-                  f"{np.percentile(revenue, 10):,.0f}",
-                  f"{np.percentile(revenue, 90):,.0f}",
+        "Value": [f"{stats['Expected_Revenue']:,.0f}",
+                  f"{stats['P10_Revenue']:,.0f}",
+                  f"{stats['P90_Revenue']:,.0f}",
                   f"{win_prob}%"]
     })
 
@@ -61,6 +80,32 @@ def main():
         mime="text/csv"
     )
 
+    # Bid curve across the whole bid range
+    st.markdown("### Bid Curve and Optimal Bid")
+    award_risk = st.checkbox("Include Auction Award Risk", value=True,
+                             help="Bids above the auction clearing price are not awarded and earn nothing.")
+    col1, col2, col3 = st.columns(3)
+    clearing_price = col1.slider("Expected Clearing Price (£/MWh)", 30, 150, 90, disabled=not award_risk)
+    clearing_scale = col2.slider("Clearing Price Uncertainty (£/MWh)", 1, 30, 10, disabled=not award_risk)
+    risk_aversion = col3.slider("Risk Aversion (λ)", 0.0, 1.0, 0.0, step=0.05,
+                                help=f"Objective is mean − λ × (mean − CVaR{int(CVAR_ALPHA * 100)}).")
+
+    curve = bid_curve(BIDS, market_price, generation, clearing_price=clearing_price if award_risk else None,
+                      clearing_scale=clearing_scale)
+    best = optimal_bid(curve, risk_aversion)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Optimal Bid (£/MWh)", f"{best['Bid']:.0f}")
+    col2.metric("Expected Revenue (£)", f"{best['Expected_Revenue']:,.0f}")
+    col3.metric("Award Probability", f"{best['Award_Probability'] * 100:.1f}%")
+
+    with stage("chart.bid_curve"):
+        fig = px.line(curve, x="Bid", y=["Expected_Revenue", "CVaR_Revenue", "P10_Revenue", "P90_Revenue"],
+                      title="Revenue Statistics by Bid", labels={"value": "Annual Revenue (£)", "variable": "Metric"})
+        fig.add_vline(x=best["Bid"], line_dash="dash", annotation_text="Optimal bid")
+        fig.update_layout(xaxis_title="Bid Strike Price (£/MWh)", height=450)
+        st.plotly_chart(fig)
+
     # Notes
     st.markdown("""
     ### 💡 Insights:
@@ -68,6 +113,7 @@ def main():
     - **P10 / P90** capture the risk range — useful for evaluating downside and upside.
     - A **higher strike** improves potential earnings but reduces **award likelihood**.
     - This tool helps identify **bid levels that balance certainty vs profit**.
+    - The **bid curve** is computed exactly from the normal price model; **CVaR** is the mean of the worst 10% of outcomes.
     """)
 
 if __name__ == "__main__":
@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
+from profiling import stage
+from stress import breakeven_shock, stress_grid, stress_table
 
 def main():
     st.title("Scenario Stress Test")
@@ -11,62 +14,44 @@ def main():
     strike = st.sidebar.slider("CfD Strike Price (£/MWh)", 50, 150, 100)
     shock_pct = st.sidebar.slider("Price Shock (%)", -50, 50, -20, step=5)
 
-    shocked_price = base_price * (1 + shock_pct / 100)
-
     # Revenue calculations
-    base_revenue = {
-        "CfD": strike * gen,
-        "PPA": (base_price - 2) * gen,
-        "Merchant": base_price * gen
-    }
-
-    shocked_revenue = {
-        "CfD": strike * gen,
-        "PPA": (shocked_price - 2) * gen,
-        "Merchant": shocked_price * gen
-    }
-
-    # Combine into DataFrame
-    df_base = pd.DataFrame.from_dict(base_revenue, orient="index", columns=["Base_Revenue"]).reset_index()
-    df_shock = pd.DataFrame.from_dict(shocked_revenue, orient="index", columns=["Shocked_Revenue"]).reset_index()
-    df = df_base.merge(df_shock, on="index")
-    df.columns = ["Strategy", "Base_Revenue", "Shocked_Revenue"]
-    df["Delta_Revenue"] = df["Shocked_Revenue"] - df["Base_Revenue"]
+    df = stress_table(gen, base_price, strike, shock_pct)
     df["Delta_%"] = 100 * df["Delta_Revenue"] / df["Base_Revenue"]
 
     # Large gauge charts for shocked revenue
     st.subheader(f"Revenue Under {shock_pct:+} % Price Shock")
-    fig = go.Figure()
-    colors = ["#1f77b4", "#ff7f0e", "#2ca02c"]
-
-    for i, row in df.iterrows():
-        fig.add_trace(go.Indicator(
-            mode="gauge+number+delta",
-            value=row["Shocked_Revenue"] / 1e6,
-            title={"text": f"{row['Strategy']} (£m)", "font": {"size": 22, "color": "white"}},
-            domain={"x": [i / len(df), (i + 1) / len(df)], "y": [0, 1]},
-            number={"font": {"size": 42, "color": "white"}},
-            delta={
-                "reference": row["Base_Revenue"] / 1e6,
-                "relative": True,
-                "position": "top",
-                "increasing": {"color": "green"},
-                "decreasing": {"color": "red"},
-            },
-            gauge={
-                "axis": {"range": [0, max(df['Shocked_Revenue']) / 1e6 * 1.2], "tickcolor": "gray"},
-                "bar": {"color": colors[i % len(colors)]},
-                "bgcolor": "black",
-                "borderwidth": 2,
-                "bordercolor": "white"
-            }
-        ))
-
-    fig.update_layout(
-        height=550,
-        margin=dict(l=10, r=10, t=40, b=10)
-    )
-    st.plotly_chart(fig)
+    with stage("chart.revenue_gauges"):
+        fig = go.Figure()
+        colors = ["#1f77b4", "#ff7f0e", "#2ca02c"]
+
+        for i, row in df.iterrows():
+            fig.add_trace(go.Indicator(
+                mode="gauge+number+delta",
+                value=row["Shocked_Revenue"] / 1e6,
+                title={"text": f"{row['Strategy']} (£m)", "font": {"size": 22, "color": "white"}},
+                domain={"x": [i / len(df), (i + 1) / len(df)], "y": [0, 1]},
+                number={"font": {"size": 42, "color": "white"}},
+                delta={
+                    "reference": row["Base_Revenue"] / 1e6,
+                    "relative": True,
+                    "position": "top",
+                    "increasing": {"color": "green"},
+                    "decreasing": {"color": "red"},
+                },
+                gauge={
+                    "axis": {"range": [0, max(df['Shocked_Revenue']) / 1e6 * 1.2], "tickcolor": "gray"},
+                    "bar": {"color": colors[i % len(colors)]},
+                    "bgcolor": "black",
+                    "borderwidth": 2,
+                    "bordercolor": "white"
+                }
+            ))
+
+        fig.update_layout(
+            height=550,
+            margin=dict(l=10, r=10, t=40, b=10)
+        )
+        st.plotly_chart(fig)
 
     # Revenue comparison table
     st.subheader("Revenue Comparison")
@@ -103,5 +88,48 @@ def main():
     for insight in insights:
         st.markdown(f"- {insight}")
 
+    # Full grid sweep
+    st.markdown("---")
+    st.subheader("Stress Grid")
+    gens = np.arange(50000, 500001, 50000)
+    base_prices = np.arange(40, 121, 5)
+    strikes = np.arange(50, 151, 5)
+    shocks = np.arange(-50, 51, 5)
+    grid = stress_grid(np.append(gens, gen), np.append(base_prices, base_price), strikes, shocks)
+    n_points = grid["CfD"]["Shocked_Revenue"].size
+    st.caption(f"{n_points:,} generation × base price × strike × shock combinations evaluated in one pass.")
+
+    # Slice at the sidebar's generation and base price (appended as the last grid entry)
+    advantage = (grid["Merchant"]["Shocked_Revenue"] - grid["CfD"]["Shocked_Revenue"])[-1, -1]
+    with stage("chart.stress_heatmap"):
+        fig_grid = go.Figure(go.Heatmap(
+            x=shocks, y=strikes, z=advantage / 1e6,
+            colorscale="RdBu", zmid=0, colorbar={"title": "£m"}
+        ))
+        fig_grid.update_layout(
+            title=f"Merchant minus CfD Revenue (Base Price £{base_price}/MWh, {gen:,} MWh)",
+            xaxis_title="Price Shock (%)",
+            yaxis_title="CfD Strike Price (£/MWh)",
+            height=500
+        )
+        st.plotly_chart(fig_grid)
+
+    breakeven = breakeven_shock(base_prices, strikes)
+    with stage("chart.breakeven_surface"):
+        fig_breakeven = go.Figure(go.Contour(
+            x=strikes, y=base_prices, z=breakeven,
+            colorscale="Viridis", contours={"showlabels": True}, colorbar={"title": "Shock %"}
+        ))
+        fig_breakeven.update_layout(
+            title="Breakeven Shock: Merchant Falls Below CfD",
+            xaxis_title="CfD Strike Price (£/MWh)",
+            yaxis_title="Base Market Price (£/MWh)",
+            height=500
+        )
+        st.plotly_chart(fig_breakeven)
+    current = breakeven_shock(base_price, strike)[0, 0]
+    st.caption(f"💡 At the current inputs the breakeven shock is {current:+.1f}%: "
+               f"Merchant earns less than CfD for any shock below it.")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,60 @@
+import os
+import time
+
+import pandas as pd
+
+from cfd_cube import load_cube
+from data_store import CHUNK_ROWS, CSV_PATH, STORE_DIR, ensure_store, iter_cfd
+
+
+def _watermark(manifest, csv_path, store_dir):
+    if manifest.get("watermark"):
+        return pd.Timestamp(manifest["watermark"])
+    # Without the Parquet store there is no manifest watermark to read, so scan for it
+    latest = None
+    for df in iter_cfd(["Settlement_Date"], csv_path=csv_path, store_dir=store_dir):
+        if len(df):
+            latest = df["Settlement_Date"].max() if latest is None else max(latest, df["Settlement_Date"].max())
+    return latest
+
+
+def ingest(path=None, csv_path=CSV_PATH, store_dir=STORE_DIR):
+    """Append the rows of path dated after the watermark to the settlement CSV, then refresh the store and cube.
+
+    With no path, picks up rows already appended to the CSV. Returns (rows added, manifest).
+    """
+    manifest = ensure_store(csv_path, store_dir)
+    added = 0
+    if path is not None:
+        watermark = _watermark(manifest, csv_path, store_dir)
+        columns = list(pd.read_csv(csv_path, nrows=0).columns)
+        # A source saved without a trailing newline would otherwise get its last row merged with the first new one
+        if os.path.getsize(csv_path):
+            with open(csv_path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) not in (b"\n", b"\r"):
+                    f.write(b"\n")
+        for df in pd.read_csv(path, dtype={"Settlement_Date": str}, chunksize=CHUNK_ROWS):
+            # Keep the original date text so the CSV stays byte-compatible with what was there before
+            dates = pd.to_datetime(df["Settlement_Date"])
+            new = df.loc[dates > watermark, columns] if watermark is not None else df[columns]
+            new.to_csv(csv_path, mode="a", header=False, index=False)
+            added += len(new)
+        manifest = ensure_store(csv_path, store_dir)
+    load_cube(store_dir, csv_path)
+    return added, manifest
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Ingest new settlement days into the store and aggregates.")
+    parser.add_argument("path", nargs="?", default=None,
+                        help="CSV of new settlement rows (omit if they were already appended to the source CSV)")
+    parser.add_argument("--csv", type=str, default=CSV_PATH, help="Source settlement CSV")
+    parser.add_argument("--store", type=str, default=STORE_DIR, help="Parquet store directory")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    added, manifest = ingest(args.path, args.csv, args.store)
+    print(f"Ingested {added} rows in {time.perf_counter() - start:.2f}s; "
+          f"{manifest.get('rows', 'n/a')} rows up to {manifest.get('watermark', 'n/a')}")
@@ -1,6 +1,7 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
+from profiling import stage
 
 def main():
     st.title("Strategy Radar Comparison")
@@ -16,22 +17,23 @@ def main():
 
     df = pd.DataFrame(radar_data)
 
-    fig = go.Figure()
-    for strategy in ["CfD", "PPA", "Merchant"]:
-        fig.add_trace(go.Scatterpolar(
-            r=df[strategy],
-            theta=df["Attribute"],
-            fill='toself',
-            name=strategy
-        ))
-
-    fig.update_layout(
-        polar=dict(radialaxis=dict(visible=True, range=[0, 10])),
-        showlegend=True,
-        title="Strategy Attribute Comparison Radar",
-        height=500
-    )
-    st.plotly_chart(fig)
+    with stage("chart.radar"):
+        fig = go.Figure()
+        for strategy in ["CfD", "PPA", "Merchant"]:
+            fig.add_trace(go.Scatterpolar(
+                r=df[strategy],
+                theta=df["Attribute"],
+                fill='toself',
+                name=strategy
+            ))
+
+        fig.update_layout(
+            polar=dict(radialaxis=dict(visible=True, range=[0, 10])),
+            showlegend=True,
+            title="Strategy Attribute Comparison Radar",
+            height=500
+        )
+        st.plotly_chart(fig)
 
     st.markdown("""
     ### 🧠 Interpretation:
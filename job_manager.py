@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from memo import normalize
+
+MAX_WORKERS = 4
+MAX_FINISHED = 32
+POLL_SECONDS = 0.25
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="job")
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """A background run of fn(job, *args, **kwargs), shared by every session asking for the same key.
+
+    fn reports progress (0..1) and partial results through report(), which raises JobCancelled once
+    the job has been cancelled so the driver unwinds at its next checkpoint.
+    """
+
+    def __init__(self, key, label):
+        self.key = key
+        self.label = label
+        self.status = "queued"
+        self.progress = 0.0
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.started = time.time()
+        self.finished = None
+        self.watchers = set()
+        self.version = 0
+        self._cancel = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ("done", "cancelled", "error")
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def report(self, progress, partial=None):
+        if self._cancel.is_set():
+            raise JobCancelled()
+        with self._changed:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+            if partial is not None:
+                self.partial = partial
+            self.version += 1
+            self._changed.notify_all()
+
+    def _finish(self, status, result=None, error=None):
+        with self._changed:
+            self.status = status
+            self.result = result
+            self.error = error
+            if status == "done":
+                self.progress = 1.0
+            self.finished = time.time()
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait(self, version=-1, timeout=None):
+        """Block until the job changes past version (or finishes); returns the new version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version or self.done, timeout)
+            return self.version
+
+    async def stream(self, interval=POLL_SECONDS):
+        """Yield (progress, partial) each time the job reports, ending once it has finished."""
+        version = None
+        while True:
+            current = await asyncio.to_thread(self.wait, -1 if version is None else version, interval)
+            if current != version:
+                version = current
+                yield self.progress, self.partial
+            if self.done:
+                return
+
+    def run(self, fn, args, kwargs):
+        self.status = "running"
+        try:
+            self._finish("done", result=fn(self, *args, **kwargs))
+        except JobCancelled:
+            self._finish("cancelled")
+        except Exception as exc:
+            self._finish("error", error=exc)
+
+
+def job_key(label, *args, **kwargs):
+    return (label, normalize((args, kwargs)))
+
+
+def _prune():
+    finished = [key for key, job in _jobs.items() if job.done]
+    for key in finished[:max(0, len(finished) - MAX_FINISHED)]:
+        del _jobs[key]
+
+
+def submit(label, fn, *args, watcher=None, **kwargs):
+    """The job running fn(job, *args, **kwargs), started now unless one with the same arguments exists.
+
+    Running and completed jobs are reused, so a Streamlit rerun with unchanged inputs attaches to the
+    work already under way; cancelled and failed jobs are started afresh. watcher (a session id, say)
+    is recorded so release() only cancels work nobody is still following.
+    """
+    key = job_key(label, *args, **kwargs)
+    with _lock:
+        job = _jobs.get(key)
+        if job is None or job.status in ("cancelled", "error") or (job.cancelled and not job.done):
+            job = Job(key, label)
+            _jobs[key] = job
+            _executor.submit(job.run, fn, args, kwargs)
+        else:
+            _jobs.move_to_end(key)
+        if watcher is not None:
+            job.watchers.add(watcher)
+        _prune()
+        return job
+
+
+def release(job, watcher):
+    """Stop following job; an unfinished job nobody else is following is cancelled."""
+    with _lock:
+        job.watchers.discard(watcher)
+        if not job.watchers and not job.done:
+            job.cancel()
+
+
+def cancel(job):
+    job.cancel()
+
+
+def list_jobs():
+    """Status, progress and age of every tracked job, most recent last."""
+    with _lock:
+        return [{
+            "Job": job.label,
+            "Status": job.status,
+            "Progress": job.progress,
+            "Watchers": len(job.watchers),
+            "Seconds": (job.finished or time.time()) - job.started
+        } for job in _jobs.values()]
@@ -6,22 +6,86 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 import os
+import pandas as pd
+import job_manager
+import memo
+import profiling
+from page_registry import get_registry
 
 PAGES = {
-    "Welcome": "a_Welcome.py",
-    "Zonal vs National Spread": "a_Zonal_vs_National_Spread.py",
-    "CfD Summary": "b_CfD_Summary.py",
-    "NPV & IRR Analysis": "c_NPV_IRR_Analysis.py",
-    "Gurobi Optimization": "c_Gurobi_Results.py",
-    "Revenue Projection Model": "d_Revenue_Projection_Model.py",
-    "ROI Analysis": "f_ROI_Analysis.py",
-    "Bidding Strategy Simulator": "g_Bidding_Strategy_Simulator.py",
-    "Scenario Stress Test": "i_Scenario_Stress_Test.py",
-    "Strategy Radar": "j_Strategy_Radar.py",
-    "Summary of Findings": "z_Summary_Findings.py"
+    "Welcome": "a_Welcome",
+    "Zonal vs National Spread": "a_Zonal_vs_National_Spread",
+    "CfD Summary": "b_CfD_Summary",
+    "NPV & IRR Analysis": "c_NPV_IRR_Analysis",
+    "Gurobi Optimization": "c_Gurobi_Results",
+    "Revenue Projection Model": "d_Revenue_Projection_Model",
+    "ROI Analysis": "f_ROI_Analysis",
+    "Bidding Strategy Simulator": "g_Bidding_Strategy_Simulator",
+    "Scenario Stress Test": "i_Scenario_Stress_Test",
+    "Strategy Radar": "j_Strategy_Radar",
+    "Summary of Findings": "z_Summary_Findings"
 }
 
+registry = get_registry(PAGES)
+
 st.sidebar.title("Navigation")
 selection = st.sidebar.radio("Go to", list(PAGES.keys()))
-module_name = PAGES[selection][:-3]
-exec(f"import {module_name} as page; page.main()")
\ No newline at end of file
+show_profile = st.sidebar.checkbox("Profiling Panel", value=profiling.DEFAULT_ENABLED)
+
+profiling.begin_run(selection, enabled=show_profile)
+try:
+    with profiling.stage("page.import"):
+        page = registry.load(selection)
+    if page is None:
+        st.error(f"The {selection} page is unavailable: {registry.error(selection)}")
+    else:
+        with profiling.stage("page.main"):
+            page.main()
+finally:
+    # Also on st.stop() or a rerun, so the run's hold on the memory tracer is released
+    records = profiling.end_run()
+
+if show_profile:
+    st.sidebar.markdown("### Profiling")
+    st.sidebar.dataframe(pd.DataFrame(profiling.summarize(records)).style.format({
+        "Seconds": "{:.3f}",
+        "Peak_MB": "{:.1f}"
+    }))
+    st.sidebar.caption(f"Appended to {profiling.PROFILE_LOG}")
+
+# Import the other pages in the background once this one has rendered
+if os.environ.get("DASHBOARD_PREWARM", "1") != "0":
+    registry.prewarm()
+
+with st.sidebar.expander("Page Import Times"):
+    for module_name, seconds in registry.import_seconds.items():
+        st.caption(f"{module_name}: {seconds * 1000:.0f} ms")
+
+with st.sidebar.expander("Cache Statistics"):
+    cache = pd.DataFrame(memo.cache_stats())
+    if len(cache):
+        cache = cache[cache["Hits"] + cache["Misses"] > 0]
+    if len(cache):
+        st.dataframe(cache.style.format({"Hit_Rate": "{:.0%}", "MB": "{:.1f}"}), hide_index=True)
+        st.caption(f"Shared by all sessions; least recently used results are evicted past {memo.MAX_BYTES / 2**20:.0f} MB")
+    else:
+        st.caption("No cached computations yet")
+
+with st.sidebar.expander("Background Jobs"):
+    jobs = pd.DataFrame(job_manager.list_jobs())
+    if len(jobs):
+        st.dataframe(jobs.style.format({"Progress": "{:.0%}", "Seconds": "{:.1f}"}), hide_index=True)
+    else:
+        st.caption("No background jobs yet")
+
+with st.sidebar.expander("Shared Data Memory"):
+    # Opt-in: the first report builds the Parquet store and mapped dataset, which must not delay first paint
+    if st.checkbox("Show Memory Report", key="shared_memory_report"):
+        import shared_dataset
+        dataset = shared_dataset.get_dataset()
+        report = shared_dataset.memory_report(dataset)
+        st.dataframe(report.style.format({"Mapped_MB": "{:.1f}", "Pandas_MB": "{:.1f}", "Session_MB": "{:.2f}"}),
+                     hide_index=True)
+        st.caption(f"{dataset.rows:,} rows mapped once per process ({report['Mapped_MB'].sum():.1f} MB); a private "
+                   f"pandas copy would cost each session {report['Pandas_MB'].sum():.1f} MB, a view "
+                   f"{report['Session_MB'].sum():.2f} MB.")
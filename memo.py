@@ -0,0 +1,170 @@
+import functools
+import hashlib
+import inspect
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numpy.lib.array_utils import byte_bounds
+except ImportError:  # numpy < 2
+    from numpy import byte_bounds
+
+MAX_ENTRIES = 512
+MAX_BYTES = int(os.environ.get("MEMO_MAX_MB", "512")) * 2**20
+
+_entries = OrderedDict()
+_stats = {}
+_lock = threading.Lock()
+_bytes = 0
+
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def normalize(value):
+    """A hashable stand-in for an argument; arrays and frames are reduced to a content hash."""
+    if isinstance(value, (str, bytes, bool, int, type(None))):
+        return value
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.ndarray):
+        return ("ndarray", value.dtype.str, value.shape, _digest(np.ascontiguousarray(value).tobytes()))
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # The content hash doubles as the data version of whatever the frame was derived from
+        columns = tuple(value.columns) if isinstance(value, pd.DataFrame) else value.name
+        return ("frame", value.shape, columns, _digest(pd.util.hash_pandas_object(value, index=True).values.tobytes()))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(normalize(v) for v in value)
+    if isinstance(value, dict):
+        return ("dict",) + tuple(sorted(((normalize(k), normalize(v)) for k, v in value.items()), key=repr))
+    if isinstance(value, (set, frozenset)):
+        return ("set",) + tuple(sorted((normalize(v) for v in value), key=repr))
+    if callable(value):
+        return ("callable", getattr(value, "__module__", None), getattr(value, "__qualname__", repr(value)))
+    return ("repr", repr(value))
+
+
+def _sizeof(value):
+    if isinstance(value, np.ndarray):
+        # Broadcast views report their logical size in nbytes; count the memory they actually span
+        low, high = byte_bounds(value)
+        return min(value.nbytes, high - low)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, (list, tuple)):
+        return sum(_sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values())
+    if hasattr(value, "__dict__"):
+        return sum(_sizeof(v) for v in vars(value).values())
+    return sys.getsizeof(value)
+
+
+def _freeze(value):
+    # Cached arrays are shared by every session, so make accidental in-place edits fail loudly
+    if isinstance(value, np.ndarray):
+        value = value.view()
+        value.flags.writeable = False
+    elif isinstance(value, dict):
+        value = {k: _freeze(v) for k, v in value.items()}
+    elif isinstance(value, tuple):
+        value = tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    # Frames can't be made read-only, so each hit gets its own copy
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_thaw(v) for v in value)
+    return value
+
+
+def _store(key, value, size):
+    global _bytes
+    with _lock:
+        if key in _entries:
+            return
+        _entries[key] = (value, size)
+        _bytes += size
+        while _entries and (len(_entries) > MAX_ENTRIES or _bytes > MAX_BYTES):
+            (name, _), (_, evicted) = _entries.popitem(last=False)
+            _bytes -= evicted
+            _stats[name]["evictions"] += 1
+
+
+def memoize(name=None, skip_if_none=(), ignore=()):
+    """Cache a pure function's results process-wide, keyed by its normalized arguments.
+
+    Every Streamlit session shares the cache, which evicts least recently used entries past
+    MAX_ENTRIES or MAX_BYTES. Calls where any argument named in skip_if_none is None (an unseeded
+    simulation, say) always run; arguments named in ignore don't change the result and stay out of the key.
+    """
+    def decorator(fn):
+        label = name or f"{fn.__module__}.{fn.__name__}"
+        signature = inspect.signature(fn)
+        _stats.setdefault(label, {"hits": 0, "misses": 0, "evictions": 0})
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if any(bound.arguments.get(arg) is None for arg in skip_if_none):
+                return fn(*args, **kwargs)
+
+            key = (label, normalize({k: v for k, v in bound.arguments.items() if k not in ignore}))
+            with _lock:
+                entry = _entries.get(key)
+                if entry is not None:
+                    _entries.move_to_end(key)
+                    _stats[label]["hits"] += 1
+                else:
+                    _stats[label]["misses"] += 1
+            if entry is not None:
+                return _thaw(entry[0])
+
+            value = _freeze(fn(*args, **kwargs))
+            size = _sizeof(value)
+            # A single result bigger than a quarter of the budget would flush everything else
+            if size <= MAX_BYTES // 4:
+                _store(key, value, size)
+            return _thaw(value)
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Hits, misses, evictions and cached size per memoized function."""
+    with _lock:
+        sizes = {}
+        counts = {}
+        for (label, _), (_, size) in _entries.items():
+            sizes[label] = sizes.get(label, 0) + size
+            counts[label] = counts.get(label, 0) + 1
+        return [{
+            "Function": label,
+            "Hits": s["hits"],
+            "Misses": s["misses"],
+            "Hit_Rate": s["hits"] / (s["hits"] + s["misses"]) if s["hits"] + s["misses"] else 0.0,
+            "Evictions": s["evictions"],
+            "Entries": counts.get(label, 0),
+            "MB": sizes.get(label, 0) / 2**20
+        } for label, s in sorted(_stats.items())]
+
+
+def clear_caches():
+    global _bytes
+    with _lock:
+        _entries.clear()
+        _bytes = 0
@@ -0,0 +1,55 @@
+import importlib
+import threading
+import time
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+class PageRegistry:
+    """Imports page modules on first use and remembers how long each import took."""
+
+    def __init__(self, pages):
+        self.pages = dict(pages)
+        self.modules = {}
+        self.import_seconds = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+        self._prewarm_thread = None
+
+    def load(self, title):
+        """The page module for title, or None if it (or one of its dependencies) failed to import."""
+        module_name = self.pages[title]
+        with self._lock:
+            if module_name in self.modules or module_name in self.errors:
+                return self.modules.get(module_name)
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError as e:
+                # A missing optional backend disables this page only
+                self.errors[module_name] = e
+                return None
+            finally:
+                self.import_seconds[module_name] = time.perf_counter() - start
+            self.modules[module_name] = module
+            return module
+
+    def error(self, title):
+        return self.errors.get(self.pages[title])
+
+    def prewarm(self):
+        """Import every remaining page on a daemon thread (call after the first page has rendered)."""
+        if self._prewarm_thread is None:
+            self._prewarm_thread = threading.Thread(
+                target=lambda: [self.load(title) for title in self.pages], name="page-prewarm", daemon=True)
+            self._prewarm_thread.start()
+
+
+def get_registry(pages):
+    """Process-wide registry for this page table, shared by every session and rerun."""
+    key = tuple(pages.items())
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = PageRegistry(pages)
+        return _registries[key]
@@ -0,0 +1,140 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PROFILE_LOG = "logs/profile.jsonl"
+
+DEFAULT_ENABLED = os.environ.get("DASHBOARD_PROFILE", "0") == "1"
+_local = threading.local()
+_log_lock = threading.Lock()
+# Profiled runs in flight across all threads; the tracer runs only while there is one
+_tracing_lock = threading.Lock()
+_tracing_runs = 0
+_tracing_owned = False
+
+
+def is_enabled():
+    return getattr(_local, "enabled", DEFAULT_ENABLED)
+
+
+def _acquire_tracing():
+    global _tracing_runs, _tracing_owned
+    with _tracing_lock:
+        _tracing_runs += 1
+        if _tracing_runs == 1 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+
+
+def _release_tracing():
+    global _tracing_runs, _tracing_owned
+    with _tracing_lock:
+        _tracing_runs -= 1
+        # Tracing slows every allocation, so stop once no profiled run needs it (unless someone else started it)
+        if _tracing_runs == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def begin_run(page, enabled=None):
+    """Start collecting stage records for one rerun of a page on this thread.
+
+    Profiled runs share one process-wide tracemalloc tracer, so a stage's peak also counts memory
+    allocated meanwhile by other sessions' threads.
+    """
+    if getattr(_local, "tracing", False):
+        # The previous run on this thread never reached end_run
+        _release_tracing()
+    _local.enabled = DEFAULT_ENABLED if enabled is None else enabled
+    _local.page = page
+    _local.records = []
+    _local.stack = []
+    _local.tracing = _local.enabled
+    if _local.tracing:
+        _acquire_tracing()
+
+
+def end_run(log_path=PROFILE_LOG):
+    """Finish the rerun, append its records to the JSON-lines log and return them."""
+    if getattr(_local, "tracing", False):
+        _local.tracing = False
+        _release_tracing()
+    records = getattr(_local, "records", [])
+    if is_enabled() and records:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        with _log_lock, open(log_path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    return records
+
+
+@contextmanager
+def stage(name):
+    """Time a block and record its peak traced memory when profiling is on for this thread."""
+    if not is_enabled() or not hasattr(_local, "records"):
+        yield
+        return
+
+    tracing = tracemalloc.is_tracing()
+    stack = _local.stack
+    entry = None
+    if tracing:
+        current, peak_so_far = tracemalloc.get_traced_memory()
+        # Hand the enclosing stage its peak so far before resetting the tracer's peak for this one.
+        # Stages running concurrently on other threads still share the one tracer.
+        if stack:
+            stack[-1]["max"] = max(stack[-1]["max"], peak_so_far)
+        tracemalloc.reset_peak()
+        entry = {"base": current, "max": current}
+        stack.append(entry)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = None
+        if entry is not None:
+            stack.pop()
+            peak_abs = max(entry["max"], tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1]["max"] = max(stack[-1]["max"], peak_abs)
+            peak = peak_abs - entry["base"]
+        _local.records.append({
+            "page": getattr(_local, "page", None),
+            "stage": name,
+            "seconds": elapsed,
+            "peak_bytes": peak,
+            "timestamp": time.time()
+        })
+
+
+def profiled(name=None):
+    """Decorator form of stage(), named after the function unless a name is given."""
+    def decorator(fn):
+        label = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return fn(*args, **kwargs)
+            with stage(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summarize(records):
+    """Wall time, call count and peak memory per stage."""
+    summary = {}
+    for record in records:
+        entry = summary.setdefault(record["stage"], {"Stage": record["stage"], "Calls": 0, "Seconds": 0.0,
+                                                     "Peak_MB": 0.0})
+        entry["Calls"] += 1
+        entry["Seconds"] += record["seconds"]
+        if record["peak_bytes"] is not None:
+            entry["Peak_MB"] = max(entry["Peak_MB"], record["peak_bytes"] / 1e6)
+    return sorted(summary.values(), key=lambda e: e["Seconds"], reverse=True)
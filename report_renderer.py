@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+CHART_CACHE_DIR = ".cache/charts"
+MAX_CACHED_CHARTS = 64
+MAX_JOBS = 32
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="report")
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_charts = OrderedDict()
+_charts_lock = threading.Lock()
+_kaleido_lock = threading.Lock()
+_warm_up = None
+
+
+def figure_hash(fig):
+    return hashlib.sha1(fig.to_json().encode()).hexdigest()
+
+
+def _start_kaleido():
+    import kaleido
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    # A throwaway export fails fast when kaleido/Chrome are missing; older kaleido also
+    # keeps its process alive after it
+    with _kaleido_lock:
+        pio.to_image(go.Figure(), format="png")
+        if hasattr(kaleido, "start_sync_server"):
+            kaleido.start_sync_server(silence_warnings=True)
+
+
+def warm_up():
+    """Start the kaleido process in the background so the first export doesn't pay for it."""
+    global _warm_up
+    if _warm_up is None:
+        _warm_up = _executor.submit(_start_kaleido)
+    return _warm_up
+
+
+def render_chart_png(fig):
+    """PNG bytes for a figure, cached in memory and on disk by the figure's content hash."""
+    key = figure_hash(fig)
+    with _charts_lock:
+        if key in _charts:
+            _charts.move_to_end(key)
+            return _charts[key]
+
+    path = os.path.join(CHART_CACHE_DIR, f"{key}.png")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            png = f.read()
+    else:
+        import plotly.io as pio
+        # One kaleido process serves every report thread
+        with _kaleido_lock:
+            png = pio.to_image(fig, format="png")
+        os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(png)
+
+    with _charts_lock:
+        _charts[key] = png
+        if len(_charts) > MAX_CACHED_CHARTS:
+            _charts.popitem(last=False)
+    return png
+
+
+def submit(key, fn, *args):
+    """Run fn(*args) on the report pool, reusing the running or finished job with the same key."""
+    with _jobs_lock:
+        future = _jobs.get(key)
+        if future is None or future.cancelled() or (future.done() and future.exception() is not None):
+            future = _executor.submit(fn, *args)
+            _jobs[key] = future
+        _jobs.move_to_end(key)
+        # Finished reports hold their PDF bytes; past MAX_JOBS the least recently used are dropped
+        finished = [k for k, f in _jobs.items() if f.done()]
+        for k in finished[:max(0, len(_jobs) - MAX_JOBS)]:
+            del _jobs[k]
+        return future
+
+
+def get_job(key):
+    with _jobs_lock:
+        future = _jobs.get(key)
+        if future is not None:
+            _jobs.move_to_end(key)
+        return future
+
+
+def submit_many(fn, keyed_args):
+    """Submit one job per (key, args) pair so many reports render in parallel."""
+    return [submit(key, fn, *args) for key, args in keyed_args]
+
+
+def build_npv_report(sections):
+    """A PDF with one NPV/IRR section per project or parameter set.
+
+    Each section is a dict with title, rate, npv, irr, payback, years, nominal, discounted
+    and an optional plotly figure.
+    """
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    for section in sections:
+        pdf.add_page()
+        pdf.set_font("Helvetica", "B", 16)
+        pdf.cell(0, 10, section["title"], ln=True)
+
+        pdf.set_font("Helvetica", "", 12)
+        pdf.cell(0, 10, f"Discount Rate: {section['rate']*100:.1f}%", ln=True)
+        pdf.cell(0, 10, f"NPV: £{section['npv']:,.0f}", ln=True)
+        pdf.cell(0, 10, f"IRR: {section['irr']}", ln=True)
+        pdf.cell(0, 10, f"Payback Year: {section['payback']}", ln=True)
+
+        pdf.ln(5)
+        pdf.multi_cell(w=190, h=8, txt="Interpretation: NPV > 0 and IRR > discount rate means the project is investable.")
+        pdf.multi_cell(w=190, h=8, txt="Payback Year indicates when cumulative discounted returns recover investment.")
+
+        pdf.ln(5)
+        pdf.set_font("Helvetica", "B", 14)
+        pdf.cell(0, 10, "Cashflow Table", ln=True)
+        pdf.set_font("Helvetica", "", 10)
+        # One multi_cell for the whole table rather than one per row
+        lines = [f"{y}: Nominal = £{n:,.0f}, Discounted = £{d:,.0f}"
+                 for y, n, d in zip(section["years"], section["nominal"], section["discounted"])]
+        pdf.multi_cell(w=190, h=8, txt="\n".join(lines))
+
+        if section.get("figure") is None:
+            continue
+        try:
+            chart_img = BytesIO(render_chart_png(section["figure"]))
+            pdf.add_page()
+            pdf.image(chart_img, x=10, y=30, w=190)
+        except Exception:
+            pdf.add_page()
+            pdf.set_font("Helvetica", "I", 12)
+            pdf.multi_cell(w=190, h=10, txt="Chart image not included. Please install 'kaleido' to enable chart rendering.")
+
+    return bytes(pdf.output())
@@ -0,0 +1,78 @@
+import numpy as np
+from scipy.stats import norm, qmc
+
+METHODS = ["pseudo", "antithetic", "sobol"]
+SOBOL_REPLICATES = 16
+
+_EPS = np.finfo(float).eps
+
+
+def group_size(n, method="pseudo"):
+    """Rows per independent group: antithetic pairs, or one randomised Sobol replicate."""
+    if method == "antithetic":
+        return 2
+    if method == "sobol":
+        return max(1, -(-n // SOBOL_REPLICATES))
+    return 1
+
+
+def standard_normals(n, dims, method="pseudo", rng=None):
+    """An (n, dims) array of N(0, 1) draws laid out in independent groups of group_size(n, method) rows.
+
+    "antithetic" interleaves each draw with its negation; "sobol" stacks SOBOL_REPLICATES independently
+    scrambled Sobol sequences, mapped through the normal inverse CDF.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if method == "pseudo":
+        return rng.standard_normal((n, dims))
+    if method == "antithetic":
+        half = rng.standard_normal((-(-n // 2), dims))
+        return np.stack([half, -half], axis=1).reshape(-1, dims)[:n]
+    if method == "sobol":
+        size = group_size(n, method)
+        m = int(np.ceil(np.log2(size)))
+        # Each replicate is a prefix of a 2^m point sequence with its own scramble
+        blocks = [qmc.Sobol(dims, scramble=True, seed=rng).random_base2(m)[:size]
+                  for _ in range(-(-n // size))]
+        return norm.ppf(np.clip(np.concatenate(blocks)[:n], _EPS, 1 - _EPS))
+    raise ValueError(f"Unknown sampling method: {method}")
+
+
+def normal_draws(means, sds, n, method="pseudo", rng=None):
+    """Draw an (n, len(means)) matrix of independent normals with the given means and sds."""
+    means = np.asarray(means, dtype=float)
+    return means + np.asarray(sds, dtype=float) * standard_normals(n, means.size, method, rng)
+
+
+def group_means(values, method="pseudo"):
+    """Means of the independent groups along axis 0; a trailing partial group is kept as is."""
+    values = np.asarray(values, dtype=float)
+    size = group_size(len(values), method)
+    if size == 1:
+        return values
+    starts = np.arange(0, len(values), size)
+    counts = np.diff(np.append(starts, len(values)))
+    return np.add.reduceat(values, starts, axis=0) / counts.reshape((-1,) + (1,) * (values.ndim - 1))
+
+
+def estimate(values, method="pseudo", control=None, control_mean=None):
+    """Mean of values along axis 0 and its standard error, honouring the sampling method's groups.
+
+    With a control (same rows as values) whose exact mean is control_mean, the estimate uses the
+    regression-adjusted values y - beta * (control - control_mean).
+    """
+    values = np.asarray(values, dtype=float)
+    if control is not None:
+        control = np.asarray(control, dtype=float)
+        centered = control - control.mean(axis=0)
+        beta = ((values - values.mean(axis=0)) * centered).sum(axis=0) / (centered * centered).sum(axis=0)
+        values = values - beta * (control - control_mean)
+    groups = group_means(values, method)
+    if len(groups) < 2:
+        return values.mean(axis=0), np.full(values.shape[1:], np.nan)
+    return values.mean(axis=0), groups.std(axis=0, ddof=1) / np.sqrt(len(groups))
+
+
+def required_samples(n, stderr, target):
+    """Draws needed to bring a standard error measured on n draws down to target (O(1/sqrt(n)) rate)."""
+    return int(np.ceil(n * np.max((np.asarray(stderr) / target) ** 2)))
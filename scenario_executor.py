@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import reduce
+
+import numpy as np
+
+from memo import memoize
+from profiling import profiled
+
+SHARD_SIZE = 10_000
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+class Moments:
+    """Mergeable count/sum/sum-of-squares/min/max per column."""
+
+    def __init__(self, count, total, total_sq, minimum, maximum):
+        self.count = np.asarray(count)
+        self.total = np.asarray(total, dtype=float)
+        self.total_sq = np.asarray(total_sq, dtype=float)
+        self.minimum = np.asarray(minimum, dtype=float)
+        self.maximum = np.asarray(maximum, dtype=float)
+
+    @classmethod
+    def from_values(cls, values, mask=None):
+        """Moments of each column of values, counting only rows where mask is True."""
+        values = np.asarray(values, dtype=float)
+        mask = np.ones(values.shape, dtype=bool) if mask is None else np.broadcast_to(mask, values.shape)
+        return cls(mask.sum(axis=0),
+                   np.where(mask, values, 0).sum(axis=0),
+                   np.where(mask, values * values, 0).sum(axis=0),
+                   np.where(mask, values, np.inf).min(axis=0),
+                   np.where(mask, values, -np.inf).max(axis=0))
+
+    def merge(self, other):
+        return Moments(self.count + other.count, self.total + other.total, self.total_sq + other.total_sq,
+                       np.minimum(self.minimum, other.minimum), np.maximum(self.maximum, other.maximum))
+
+    @property
+    def mean(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.total / self.count
+
+    @property
+    def std(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (self.total_sq - self.total ** 2 / self.count) / (self.count - 1)
+        return np.sqrt(np.clip(var, 0, None))
+
+
+def default_workers():
+    return int(os.environ.get("SCENARIO_WORKERS", os.cpu_count() or 1))
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        # A pool whose worker died (OOM-killed, say) fails every later submit, so replace it too
+        if _pool is None or _pool_workers != workers or getattr(_pool, "_broken", False):
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # Spawned workers avoid forking the Streamlit server's threads
+            _pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shard_plan(n_scenarios, seed=None, shard_size=SHARD_SIZE):
+    """Split scenarios into fixed-size shards, each with its own spawned SeedSequence.
+
+    The plan depends only on n_scenarios, seed and shard_size, never on the worker count,
+    so every shard draws the same numbers wherever it runs.
+    """
+    sizes = [shard_size] * (n_scenarios // shard_size)
+    if n_scenarios % shard_size:
+        sizes.append(n_scenarios % shard_size)
+    return list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+
+def iter_scenarios(kernel, n_scenarios, params, seed=None, shard_size=SHARD_SIZE, workers=None):
+    """Yield kernel(size, seed_sequence, params) for each shard, in shard order."""
+    plan = shard_plan(n_scenarios, seed, shard_size)
+    workers = workers or default_workers()
+    if workers == 1 or len(plan) == 1:
+        for size, seed_seq in plan:
+            yield kernel(size, seed_seq, params)
+        return
+
+    done = 0
+    for attempt in range(2):
+        futures = []
+        try:
+            futures = [_get_pool(workers).submit(kernel, size, seed_seq, params) for size, seed_seq in plan[done:]]
+            for future in futures:
+                result = future.result()
+                done += 1
+                yield result
+            return
+        except BrokenProcessPool:
+            # Retry the outstanding shards once on a fresh pool; shards are seeded, so results don't change
+            if attempt:
+                raise
+        finally:
+            # Consumers that stop early (adaptive sampling) release the shards they no longer need
+            for future in futures:
+                future.cancel()
+
+
+def merge_partials(a, b):
+    if isinstance(a, np.ndarray):
+        return np.concatenate([a, b])
+    return a.merge(b)
+
+
+@profiled("simulate.run_scenarios")
+@memoize("simulate.run_scenarios", skip_if_none=("seed",), ignore=("workers",))
+def run_scenarios(kernel, n_scenarios, params, seed=None, shard_size=SHARD_SIZE, workers=None):
+    """Run all shards across the process pool and merge their partial results in shard order."""
+    return reduce(merge_partials, iter_scenarios(kernel, n_scenarios, params, seed, shard_size, workers))
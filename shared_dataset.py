@@ -0,0 +1,358 @@
+import io
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_store import CHUNK_ROWS, CSV_PATH, STORE_DIR, ds, ensure_store, iter_cfd
+from profiling import profiled
+
+DATASET_DIR = "data/cfd_shared"
+META_FILE = "_meta.json"
+
+CATEGORIES = ["Technology", "Reference_Type"]
+MEASURES = [
+    "Strike_Price_GBP_Per_MWh",
+    "Price_Spread_Strike_vs_Market",
+    "Price_Spread_Strike_vs_IMRP",
+    "CFD_Generation_MWh",
+    "CFD_Payments_GBP",
+    "Avoided_GHG_tonnes_CO2e",
+]
+DTYPES = {
+    "Settlement_Date": "datetime64[s]",
+    "Year": "int16",
+    **{m: "float32" for m in MEASURES},
+    "Subsidy_Rate": "float32",
+}
+# Measures with running totals stored beside the columns, for date-range sums without a scan
+INDEXED_MEASURES = MEASURES + ["Subsidy_Rate"]
+# Each ingest adds one more run of rows per series; past this many the files are rebuilt in order
+MAX_SERIES_RUNS = 32
+
+_datasets = {}
+_lock = threading.Lock()
+
+
+def _load(directory, name, length):
+    # Files can run past the meta's row count while an append is being written; the meta is authoritative
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")[:length]
+
+
+class SharedDataset:
+    """Read-only settlement rows memory-mapped from one .npy file per column.
+
+    Rows are sorted by Technology, Reference_Type and Settlement_Date when built, and rows ingested
+    since are appended as further sorted runs, so every series is a few contiguous, date-ordered
+    slices (one row of groups each). Every session in the process reads the same pages; frame() hands
+    out views, not copies.
+
+    sums[m] (and counts[m], when m has gaps) hold the running total of measure m over all rows, with a
+    leading zero, so any run of rows sums to the difference of two entries.
+    """
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.version = meta["version"]
+        self.rows = meta["rows"]
+        self.categories = meta["categories"]
+        self.groups = pd.DataFrame(meta["groups"], columns=CATEGORIES + ["Start", "Stop"])
+        self.columns = {name: _load(directory, name, self.rows) for name in meta["columns"]}
+        self.sums = {m: _load(directory, f"{m}.sum", self.rows + 1) for m in INDEXED_MEASURES}
+        self.counts = {m: _load(directory, f"{m}.count", self.rows + 1) if m in meta["counted"] else None
+                       for m in INDEXED_MEASURES}
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def _column(self, name, rows):
+        values = self.columns[name][rows]
+        if name in self.categories:
+            return pd.Categorical.from_codes(values, self.categories[name], validate=False)
+        return values
+
+    def slices(self, where=None, start=None, end=None):
+        """(group row, slice) for each Technology x Reference_Type series matching where, cut to start..end."""
+        dates = self.columns["Settlement_Date"]
+        start = None if start is None else np.datetime64(pd.Timestamp(start), "s")
+        end = None if end is None else np.datetime64(pd.Timestamp(end), "s")
+        groups = self.groups
+        for dim, allowed in (where or {}).items():
+            groups = groups[groups[dim].isin(allowed)]
+        for _, group in groups.iterrows():
+            first = int(group["Start"])
+            series = dates[first:int(group["Stop"])]
+            lo = first + (int(np.searchsorted(series, start, side="left")) if start is not None else 0)
+            hi = first + (int(np.searchsorted(series, end, side="right")) if end is not None else len(series))
+            yield group, slice(lo, max(lo, hi))
+
+    def frame(self, columns=None, where=None, start=None, end=None):
+        """Rows matching where (dimension -> allowed values) between start and end (inclusive).
+
+        The result wraps the mapped buffers directly when the selection is one contiguous run of
+        rows (everything, or a single series); otherwise only the selected rows are gathered.
+        """
+        columns = list(self.columns) if columns is None else columns
+        if where is None and start is None and end is None:
+            rows = slice(0, self.rows)
+        else:
+            runs = [s for _, s in self.slices(where, start, end) if s.stop > s.start]
+            if len(runs) == 1:
+                rows = runs[0]
+            else:
+                rows = np.concatenate([np.arange(s.start, s.stop) for s in runs]) if runs else slice(0, 0)
+        return pd.DataFrame({name: self._column(name, rows) for name in columns}, copy=False)
+
+
+def _encode(chunk, categories):
+    """Column arrays (dates, years, category codes, measures) for a chunk of settlement rows."""
+    dates = pd.to_datetime(chunk["Settlement_Date"])
+    encoded = {"Settlement_Date": dates.to_numpy(dtype="datetime64[s]"), "Year": dates.dt.year.to_numpy()}
+    for name in CATEGORIES:
+        encoded[name] = pd.Categorical(chunk[name], categories=categories[name]).codes
+    for name in MEASURES:
+        encoded[name] = chunk[name].to_numpy(dtype=float)
+    encoded["Subsidy_Rate"] = (chunk["CFD_Payments_GBP"] / chunk["CFD_Generation_MWh"]).to_numpy(dtype=float)
+    return encoded
+
+
+def _series_groups(columns, categories, rows, offset=0):
+    """[Technology, Reference_Type, Start, Stop] for each run of one series in key-sorted columns."""
+    keys = np.stack([columns[name][:rows] for name in CATEGORIES], axis=1).astype(int)
+    starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)]) if rows else np.array([], dtype=int)
+    stops = np.append(starts[1:], rows)
+    return [[categories[name][keys[s, i]] for i, name in enumerate(CATEGORIES)] + [offset + int(s), offset + int(e)]
+            for s, e in zip(starts, stops) if keys[s].min() >= 0]
+
+
+def _accumulate(out, first, values, transform, chunk_rows=CHUNK_ROWS):
+    """Fill out[first + 1:] with the running total of transform(values), carried on from out[first]."""
+    for lo in range(0, len(values), chunk_rows):
+        part = np.cumsum(transform(np.asarray(values[lo:lo + chunk_rows])), dtype=out.dtype)
+        out[first + lo + 1:first + lo + 1 + len(part)] = out[first + lo] + part
+
+
+def _present(values):
+    return ~np.isnan(values)
+
+
+def _filled(values):
+    return np.nan_to_num(values, nan=0.0)
+
+
+def _extend_npy(path, length, values):
+    """Write values after the first length entries of the 1-D .npy at path, growing its header to match.
+
+    NumPy pads .npy headers so the shape can grow in place; mappings of the old length stay valid.
+    """
+    fmt = np.lib.format
+    with open(path, "r+b") as f:
+        version = fmt.read_magic(f)
+        read_header, write_header = ((fmt.read_array_header_1_0, fmt.write_array_header_1_0) if version == (1, 0)
+                                     else (fmt.read_array_header_2_0, fmt.write_array_header_2_0))
+        dtype = read_header(f)[2]
+        offset = f.tell()
+        header = io.BytesIO()
+        write_header(header, {"descr": fmt.dtype_to_descr(dtype), "fortran_order": False,
+                              "shape": (length + len(values),)})
+        if header.tell() != offset:
+            raise ValueError(f"{path}: the grown header no longer fits in place")
+        f.seek(offset + length * dtype.itemsize)
+        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        f.truncate()
+        f.seek(0)
+        f.write(header.getvalue())
+
+
+def _write_meta(dataset_dir, meta):
+    tmp_path = os.path.join(dataset_dir, META_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(dataset_dir, META_FILE))
+
+
+def _build_dataset(dataset_dir, version, csv_path, store_dir, chunk_rows=CHUNK_ROWS):
+    # First pass over the (columnar, cheap) dimension columns: row count and category lists
+    rows, seen = 0, {name: set() for name in CATEGORIES}
+    for chunk in iter_cfd(CATEGORIES, chunk_rows, csv_path, store_dir):
+        rows += len(chunk)
+        for name in CATEGORIES:
+            seen[name].update(chunk[name].dropna().unique())
+    categories = {name: sorted(values) for name, values in seen.items()}
+
+    tmp_dir = f"{dataset_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    dtypes = dict(DTYPES)
+    for name in CATEGORIES:
+        # Same code width pandas would pick, so from_codes can wrap the mapped codes as they are
+        dtypes[name] = pd.Categorical.from_codes([], categories[name]).codes.dtype.str
+    columns = {name: np.lib.format.open_memmap(os.path.join(tmp_dir, f"{name}.npy"), "w+", dtype, (rows,))
+               for name, dtype in dtypes.items()}
+
+    offset = 0
+    source_columns = ["Settlement_Date"] + CATEGORIES + MEASURES
+    for chunk in iter_cfd(source_columns, chunk_rows, csv_path, store_dir):
+        part = slice(offset, offset + len(chunk))
+        for name, values in _encode(chunk, categories).items():
+            columns[name][part] = values
+        offset += len(chunk)
+
+    # Sort so each series is contiguous and date-ordered; permuting one column at a time bounds the extra memory
+    order = np.lexsort((columns["Settlement_Date"], columns["Reference_Type"], columns["Technology"]))
+    for column in columns.values():
+        column[:] = column[order]
+        column.flush()
+    del order
+    groups = _series_groups(columns, categories, rows)
+
+    # Running totals in float64, a chunk at a time: float32 ones would lose the small ranges to rounding
+    counted = []
+    for m in INDEXED_MEASURES:
+        sums = np.lib.format.open_memmap(os.path.join(tmp_dir, f"{m}.sum.npy"), "w+", "float64", (rows + 1,))
+        _accumulate(sums, 0, columns[m], _filled, chunk_rows)
+        sums.flush()
+        # Without gaps the count is just the row span, so skip the extra file
+        if any(np.isnan(columns[m][lo:lo + chunk_rows]).any() for lo in range(0, rows, chunk_rows)):
+            counts = np.lib.format.open_memmap(os.path.join(tmp_dir, f"{m}.count.npy"), "w+", "int64", (rows + 1,))
+            _accumulate(counts, 0, columns[m], _present, chunk_rows)
+            counts.flush()
+            counted.append(m)
+        del sums
+    del columns
+
+    _write_meta(tmp_dir, {"version": version, "rows": rows, "columns": dtypes, "categories": categories,
+                          "groups": groups, "counted": counted})
+    old_dir = f"{dataset_dir}.old-{os.getpid()}"
+    if os.path.exists(dataset_dir):
+        os.replace(dataset_dir, old_dir)
+    os.replace(tmp_dir, dataset_dir)
+    # Sessions still holding the previous version keep their mappings; the files go once unmapped
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _append_dataset(dataset_dir, meta, manifest, store_dir):
+    """Add the store parts ingested since meta's version to the files in place; returns the new meta.
+
+    New rows all fall after the store's watermark, so sorted by series they extend each series with one
+    more date-ordered run. Returns None (rebuild instead) when the manifest can't bridge the gap, the
+    rows bring a category the codes don't cover, or a series would split into too many runs.
+    """
+    version, files = meta["version"], []
+    for entry in manifest.get("appends", []):
+        if entry["from"] == version:
+            files += entry["files"]
+            version = entry["to"]
+    if ds is None or version != manifest["sha1"]:
+        return None
+    rows, categories = meta["rows"], meta["categories"]
+    if not files:
+        return {**meta, "version": version}
+
+    parts = ds.dataset([os.path.join(store_dir, f) for f in files], format="parquet", partitioning="hive",
+                       partition_base_dir=store_dir)
+    chunk = parts.to_table(columns=["Settlement_Date"] + CATEGORIES + MEASURES).to_pandas()
+    new = _encode(chunk, categories)
+    if any(((new[name] < 0) & chunk[name].notna().to_numpy()).any() for name in CATEGORIES):
+        return None
+    order = np.lexsort((new["Settlement_Date"], new["Reference_Type"], new["Technology"]))
+    new = {name: values[order] for name, values in new.items()}
+    added = len(order)
+    groups = sorted(meta["groups"] + _series_groups(new, categories, added, offset=rows))
+    runs = pd.DataFrame(groups, columns=CATEGORIES + ["Start", "Stop"]).groupby(CATEGORIES).size()
+    if len(runs) and runs.max() > MAX_SERIES_RUNS:
+        return None
+
+    counted = list(meta["counted"])
+    for m in INDEXED_MEASURES:
+        if m not in counted and np.isnan(new[m]).any():
+            # First gap in this measure: count the (gapless) rows so far once, then keep extending
+            counts = np.lib.format.open_memmap(os.path.join(dataset_dir, f"{m}.count.npy"), "w+", "int64", (rows + 1,))
+            _accumulate(counts, 0, _load(dataset_dir, m, rows), _present)
+            counts.flush()
+            del counts
+            counted.append(m)
+    for m in INDEXED_MEASURES:
+        for suffix, transform, dtype in (("sum", _filled, "float64"), ("count", _present, "int64")):
+            if suffix == "count" and m not in counted:
+                continue
+            path = os.path.join(dataset_dir, f"{m}.{suffix}.npy")
+            totals = np.empty(added + 1, dtype=dtype)
+            totals[0] = _load(dataset_dir, f"{m}.{suffix}", rows + 1)[rows]
+            _accumulate(totals, 0, new[m], transform)
+            _extend_npy(path, rows + 1, totals[1:])
+    for name in meta["columns"]:
+        _extend_npy(os.path.join(dataset_dir, f"{name}.npy"), rows, new[name])
+
+    # The meta is written last, so an interrupted append leaves the previous version readable
+    meta = {**meta, "version": version, "rows": rows + added, "groups": groups, "counted": counted}
+    _write_meta(dataset_dir, meta)
+    return meta
+
+
+@profiled("data.shared_dataset")
+def get_dataset(csv_path=CSV_PATH, store_dir=STORE_DIR, dataset_dir=DATASET_DIR):
+    """The process-wide SharedDataset for the current data version, building its files on first use.
+
+    After an incremental ingest the new rows are appended to the existing files rather than rebuilt.
+    """
+    manifest = ensure_store(csv_path, store_dir)
+    version = manifest["sha1"]
+    with _lock:
+        dataset = _datasets.get(dataset_dir)
+        if dataset is not None and dataset.version == version:
+            return dataset
+        try:
+            with open(os.path.join(dataset_dir, META_FILE)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+        if meta is not None and meta["version"] != version and "counted" in meta:
+            meta = _append_dataset(dataset_dir, meta, manifest, store_dir)
+        if meta is None or meta["version"] != version or "counted" not in meta:
+            _build_dataset(dataset_dir, version, csv_path, store_dir)
+            with open(os.path.join(dataset_dir, META_FILE)) as f:
+                meta = json.load(f)
+        dataset = _datasets[dataset_dir] = SharedDataset(dataset_dir, meta)
+        return dataset
+
+
+def _shared_bytes(series, buffers):
+    values = series.array._ndarray if isinstance(series.dtype, pd.CategoricalDtype) else series.to_numpy()
+    return any(np.shares_memory(values, buffer) for buffer in buffers)
+
+
+def memory_report(dataset, frame=None):
+    """Per-column bytes: mapped once per process, a plain pandas load per session, and frame's own copy.
+
+    "Pandas_MB" is what each session would hold after pd.read_csv (float64 and string columns);
+    "Session_MB" is what frame (a view from dataset.frame) adds on top of the shared mapping.
+    """
+    frame = dataset.frame() if frame is None else frame
+    # Strings vary in length between technologies, so sample across the whole (sorted) range
+    sample = dataset.frame(list(dataset.categories)).iloc[::max(1, dataset.rows // 10_000)]
+    scale = dataset.rows / max(len(sample), 1)
+    buffers = list(dataset.columns.values())
+    report = []
+    for name, column in dataset.columns.items():
+        if name in dataset.categories:
+            naive = sample[name].astype(str).memory_usage(index=False, deep=True) * scale
+        elif name == "Year":
+            naive = 0  # not in the CSV; each page derived it from Settlement_Date
+        else:
+            naive = dataset.rows * 8
+        own = 0
+        if name in frame and not _shared_bytes(frame[name], buffers):
+            own = frame[name].memory_usage(index=False, deep=True)
+        report.append({
+            "Column": name,
+            "Dtype": str(frame[name].dtype) if name in frame else str(column.dtype),
+            "Mapped_MB": column.nbytes / 2**20,
+            "Pandas_MB": naive / 2**20,
+            "Session_MB": own / 2**20,
+        })
+    return pd.DataFrame(report)
@@ -0,0 +1,175 @@
+import os
+import threading
+
+import numpy as np
+
+SENSES = {"<=": "<", ">=": ">", "=": "=", "==": "="}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_gurobi_ok = None
+
+
+def gurobi_available():
+    """True when gurobipy is installed and a licensed environment can be started."""
+    global _gurobi_ok
+    if _gurobi_ok is None:
+        _gurobi_ok = False
+        # gurobipy is imported on first use so pages that never solve don't pay for it
+        try:
+            import gurobipy as gp
+        except ImportError:
+            gp = None
+        if gp is not None:
+            try:
+                env = gp.Env(empty=True)
+                env.setParam("OutputFlag", 0)
+                env.start()
+                env.dispose()
+                _gurobi_ok = True
+            except gp.GurobiError:
+                pass
+    return _gurobi_ok
+
+
+def default_backend():
+    backend = os.environ.get("SOLVER_BACKEND")
+    if backend:
+        return backend
+    return "gurobi" if gurobi_available() else "highs"
+
+
+class GurobiSession:
+    """A maximization model built once; solves only update objective coefficients and RHS."""
+
+    backend = "gurobi"
+
+    def __init__(self, rows, senses, integer=True):
+        import gurobipy as gp
+        from gurobipy import GRB
+
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        self.env = gp.Env(empty=True)
+        self.env.setParam("OutputFlag", 0)
+        self.env.start()
+        self.model = gp.Model(env=self.env)
+        vtype = GRB.BINARY if integer else GRB.CONTINUOUS
+        self.x = self.model.addMVar(rows.shape[1], lb=0, ub=1, vtype=vtype)
+        self.constrs = self.model.addMConstr(rows, self.x, np.array([SENSES[s] for s in senses]),
+                                             np.zeros(rows.shape[0]))
+        self.model.ModelSense = GRB.MAXIMIZE
+        self.optimal = GRB.OPTIMAL
+        self.last_x = None
+
+    def solve(self, objective, rhs):
+        self.x.Obj = np.asarray(objective, dtype=float)
+        self.constrs.RHS = np.asarray(rhs, dtype=float)
+        if self.last_x is not None:
+            self.x.Start = self.last_x
+        self.model.optimize()
+        if self.model.Status != self.optimal:
+            return None
+        self.last_x = self.x.X
+        return self.last_x
+
+    def close(self):
+        self.model.dispose()
+        self.env.dispose()
+
+
+def _row_bounds(senses, rhs):
+    rhs = np.asarray(rhs, dtype=float)
+    senses = np.asarray(senses)
+    lb = np.where(senses == "<", -np.inf, rhs)
+    ub = np.where(senses == ">", np.inf, rhs)
+    return lb, ub
+
+
+class HighsSession:
+    """The same session interface on scipy's HiGHS MILP solver (no warm starts)."""
+
+    backend = "highs"
+
+    def __init__(self, rows, senses, integer=True):
+        from scipy.optimize import Bounds
+
+        self.rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        self.senses = [SENSES[s] for s in senses]
+        self.integrality = np.ones(self.rows.shape[1]) if integer else np.zeros(self.rows.shape[1])
+        self.bounds = Bounds(0, 1)
+
+    def solve(self, objective, rhs):
+        from scipy.optimize import LinearConstraint, milp
+
+        lb, ub = _row_bounds(self.senses, rhs)
+        result = milp(-np.asarray(objective, dtype=float), integrality=self.integrality, bounds=self.bounds,
+                      constraints=LinearConstraint(self.rows, lb, ub))
+        return result.x if result.success else None
+
+    def close(self):
+        pass
+
+
+class _LockedSession:
+    def __init__(self, session):
+        self.session = session
+        self.backend = session.backend
+        self.lock = threading.Lock()
+
+    def solve(self, objective, rhs):
+        # Sessions are shared by every Streamlit session thread in the process
+        with self.lock:
+            return self.session.solve(objective, rhs)
+
+
+def get_session(rows, senses, integer=True, backend=None):
+    """Return the process-wide session for this constraint structure, building it on first use."""
+    backend = backend or default_backend()
+    rows = np.atleast_2d(np.asarray(rows, dtype=float))
+    key = (backend, rows.shape, rows.tobytes(), tuple(senses), integer)
+    with _sessions_lock:
+        if key not in _sessions:
+            cls = GurobiSession if backend == "gurobi" else HighsSession
+            _sessions[key] = _LockedSession(cls(rows, senses, integer))
+        return _sessions[key]
+
+
+def solve_lp(objective, rows, senses, rhs, lb=0, ub=np.inf, backend=None):
+    """Maximize objective @ x for a one-off LP whose (possibly sparse) rows are handed over in bulk.
+
+    Returns (x, backend used); x is None when the solver does not reach an optimum. Models too large
+    for a size-limited Gurobi licence are solved with HiGHS instead.
+    """
+    backend = backend or default_backend()
+    objective = np.asarray(objective, dtype=float)
+    senses = [SENSES[s] for s in senses]
+    if backend == "gurobi":
+        import gurobipy as gp
+        from gurobipy import GRB
+
+        try:
+            with gp.Env(empty=True) as env:
+                env.setParam("OutputFlag", 0)
+                env.start()
+                with gp.Model(env=env) as model:
+                    x = model.addMVar(len(objective), lb=lb, ub=ub, obj=objective)
+                    model.addMConstr(rows, x, np.array(senses), np.asarray(rhs, dtype=float))
+                    model.ModelSense = GRB.MAXIMIZE
+                    model.optimize()
+                    return (x.X if model.Status == GRB.OPTIMAL else None), backend
+        except gp.GurobiError:
+            backend = "highs"
+
+    from scipy.optimize import Bounds, LinearConstraint, milp
+
+    row_lb, row_ub = _row_bounds(senses, rhs)
+    result = milp(-objective, integrality=np.zeros(len(objective)), bounds=Bounds(lb, ub),
+                  constraints=LinearConstraint(rows, row_lb, row_ub))
+    return (result.x if result.success else None), "highs"
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.session.close()
+        _sessions.clear()
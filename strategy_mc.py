@@ -0,0 +1,127 @@
+import numpy as np
+
+from scenario_executor import SHARD_SIZE, Moments, iter_scenarios
+from memo import memoize
+from profiling import profiled
+from sampling import normal_draws
+
+STRATEGIES = ["CfD", "PPA", "Merchant"]
+VOLATILITY = [5, 8, 10]
+
+Z_SCORES = {0.90: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+
+
+def draw_values(means, sds, n, rng=None, method="pseudo"):
+    """Draw an (n, strategies) matrix of normally distributed strategy values."""
+    return normal_draws(means, sds, n, method, rng)
+
+
+def choose_strategies(values, constraints=None, solve=None):
+    """Index of the chosen strategy for each row of values.
+
+    Picking one of the strategies without further constraints is a row-wise argmax; the
+    optimizer in `solve` is only called per row when side constraints are given.
+    """
+    if not constraints:
+        return np.argmax(values, axis=1)
+    return np.array([solve(row, constraints) for row in values])
+
+
+def convergence_counts(choices, steps, n_strategies=len(STRATEGIES)):
+    """Cumulative selection counts per strategy after each number of simulations in steps."""
+    idx = np.asarray(steps) - 1
+    return np.column_stack([np.cumsum(choices == j)[idx] for j in range(n_strategies)])
+
+
+def share_half_width(counts, n, confidence=0.95):
+    """Agresti-Coull confidence half-width of each strategy's selection share.
+
+    Unlike the plain Wald width it stays positive when a share is 0 or 1, so a strategy that
+    has not been picked yet doesn't count as pinned down.
+    """
+    z2 = Z_SCORES[confidence] ** 2
+    n_adj = n + z2
+    p = (np.asarray(counts) + z2 / 2) / n_adj
+    return Z_SCORES[confidence] * np.sqrt(p * (1 - p) / n_adj)
+
+
+def choice_kernel(size, seed_seq, params):
+    means, sds, constraints, solve, method = params
+    values = draw_values(means, sds, size, np.random.default_rng(seed_seq), method)
+    return choose_strategies(values, constraints, solve)
+
+
+def tally_kernel(size, seed_seq, params):
+    """Moments of the winning value per strategy; the count is how often each strategy wins."""
+    means, sds, method = params
+    values = draw_values(means, sds, size, np.random.default_rng(seed_seq), method)
+    chosen = np.argmax(values, axis=1)
+    best = values[np.arange(size), chosen]
+    mask = chosen[:, None] == np.arange(len(means))
+    return Moments.from_values(np.broadcast_to(best[:, None], mask.shape), mask)
+
+
+def iter_adaptive_choices(means, sds, max_n, tolerance=None, confidence=0.95, batch=100, seed=None,
+                          constraints=None, solve=None, workers=None, method="pseudo", shard_size=None):
+    """Yield chosen strategy indices shard by shard until every share's half-width is within tolerance.
+
+    The rule is checked after every `batch` draws, so the stopping point does not depend on how
+    shards are spread across workers. Antithetic pairs are scored as single observations, so their
+    variance reduction shortens the run; Sobol draws use the plain binomial width, which is conservative.
+    As in the Agresti-Coull interval, z^2 pseudo-observations (half picked, half not) are added before
+    the width is taken, so a share still sitting at 0 or 1 can't stop the run early.
+    """
+    # Per-row solves are slow enough to be worth spreading over more, smaller shards
+    shard_size = shard_size or (1_000 if constraints else SHARD_SIZE)
+    group = 2 if method == "antithetic" else 1
+    shards = iter_scenarios(choice_kernel, max_n, (means, sds, constraints, solve, method), seed, shard_size,
+                            workers)
+    sums = np.zeros(len(means))
+    sums_sq = np.zeros(len(means))
+    groups = 0
+    try:
+        for chosen in shards:
+            hits = chosen[:, None] == np.arange(len(means))
+            if tolerance and len(chosen) % group == 0:
+                scores = hits.reshape(-1, group, len(means)).mean(axis=1)
+                cumulative = sums + np.cumsum(scores, axis=0)
+                cumulative_sq = sums_sq + np.cumsum(scores * scores, axis=0)
+                counts = groups + np.arange(1, len(scores) + 1)
+                check = np.flatnonzero((counts * group) % batch == 0)
+                check = check[counts[check] > 1]
+                z2 = Z_SCORES[confidence] ** 2
+                n = counts[check, None] + z2
+                total, total_sq = cumulative[check] + z2 / 2, cumulative_sq[check] + z2 / 2
+                var = (total_sq - total ** 2 / n) / (n - 1)
+                half_width = Z_SCORES[confidence] * np.sqrt(np.clip(var, 0, None) / n)
+                done = half_width.max(axis=1) <= tolerance
+                if done.any():
+                    yield chosen[:(check[np.argmax(done)] + 1) * group]
+                    return
+                sums, sums_sq, groups = cumulative[-1], cumulative_sq[-1], counts[-1]
+            yield chosen
+    finally:
+        shards.close()
+
+
+@profiled("simulate.strategy_choices")
+@memoize("simulate.strategy_choices", skip_if_none=("seed",), ignore=("workers",))
+def adaptive_choices(means, sds, max_n, tolerance=None, confidence=0.95, batch=100, seed=None,
+                     constraints=None, solve=None, workers=None, method="pseudo", shard_size=None):
+    """Every choice iter_adaptive_choices makes, as one array."""
+    return np.concatenate(list(iter_adaptive_choices(means, sds, max_n, tolerance, confidence, batch, seed,
+                                                     constraints, solve, workers, method, shard_size)))
+
+
+def adaptive_choices_job(job, means, sds, max_n, **kwargs):
+    """adaptive_choices as a job_manager job, reporting the choices made so far after every shard."""
+    chunks, n = [], 0
+    shards = iter_adaptive_choices(means, sds, max_n, **kwargs)
+    try:
+        for chosen in shards:
+            chunks.append(chosen)
+            n += len(chosen)
+            job.report(n / max_n, np.concatenate(chunks))
+    finally:
+        shards.close()
+    return np.concatenate(chunks)
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from memo import memoize
+from profiling import profiled
+
+PPA_DISCOUNT = 2
+
+
+@profiled("compute.stress_grid")
+@memoize("compute.stress_grid")
+def stress_grid(gen, base_price, strike, shock_pct):
+    """Base and shocked CfD/PPA/Merchant revenue over the Cartesian grid of the inputs.
+
+    Each input may be a scalar or 1-D array; every result has shape (gen, base_price, strike, shock_pct).
+    """
+    gen, base_price, strike, shock_pct = np.ix_(*[np.atleast_1d(np.asarray(v, dtype=float))
+                                                  for v in (gen, base_price, strike, shock_pct)])
+    shape = np.broadcast_shapes(gen.shape, base_price.shape, strike.shape, shock_pct.shape)
+    shocked_price = base_price * (1 + shock_pct / 100)
+
+    base = {
+        "CfD": strike * gen,
+        "PPA": (base_price - PPA_DISCOUNT) * gen,
+        "Merchant": base_price * gen
+    }
+    shocked = {
+        "CfD": strike * gen,
+        "PPA": (shocked_price - PPA_DISCOUNT) * gen,
+        "Merchant": shocked_price * gen
+    }
+    grid = {}
+    for s in base:
+        grid[s] = {
+            "Base_Revenue": np.broadcast_to(base[s], shape),
+            "Shocked_Revenue": np.broadcast_to(shocked[s], shape),
+            "Delta_Revenue": np.broadcast_to(shocked[s] - base[s], shape)
+        }
+    return grid
+
+
+def stress_table(gen, base_price, strike, shock_pct):
+    """Base, shocked and delta revenue per strategy for one scenario: the 1x1x1x1 point of stress_grid."""
+    grid = stress_grid(gen, base_price, strike, shock_pct)
+    return pd.DataFrame([{"Strategy": s, **{k: float(v.ravel()[0]) for k, v in cols.items()}}
+                         for s, cols in grid.items()])
+
+
+def breakeven_shock(base_price, strike):
+    """Price shock (%) below which Merchant revenue falls under CfD, over the base price x strike grid."""
+    base_price, strike = np.ix_(np.atleast_1d(base_price).astype(float), np.atleast_1d(strike).astype(float))
+    return 100 * (strike / base_price - 1)
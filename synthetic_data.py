@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+TECHNOLOGIES = {
+    # technology: (mean strike £/MWh, mean generation MWh per settlement row, GHG tCO2e per MWh)
+    "Offshore Wind": (95, 6000, 0.35),
+    "Onshore Wind": (80, 1500, 0.35),
+    "Solar PV": (75, 400, 0.35),
+    "Biomass Conversion": (120, 9000, 0.30),
+    "Energy from Waste": (110, 300, 0.20),
+    "Advanced Conversion Technology": (130, 200, 0.25),
+}
+REFERENCE_TYPES = ["IMRP", "BMRP"]
+CHUNK_ROWS = 1_000_000
+
+
+def generate_cfd(n_rows, seed=0, start="2015-01-01", end="2060-12-31"):
+    """A deterministic frame shaped like data/cfd_processed.csv."""
+    rng = np.random.default_rng(seed)
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    dates = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days, n_rows)), unit="D")
+
+    names = list(TECHNOLOGIES)
+    tech_idx = rng.integers(0, len(names), n_rows)
+    strike_mean, gen_mean, ghg_rate = (np.array(v, dtype=float)[tech_idx] for v in zip(*TECHNOLOGIES.values()))
+    reference = np.where(np.isin(tech_idx, [3, 4, 5]), "BMRP", "IMRP")
+
+    strike = strike_mean + rng.normal(0, 8, n_rows)
+    market = rng.normal(65, 20, n_rows)
+    imrp = market + rng.normal(0, 4, n_rows)
+    generation = rng.gamma(2.0, gen_mean / 2.0)
+    return pd.DataFrame({
+        "Settlement_Date": dates,
+        "Technology": np.array(names)[tech_idx],
+        "Reference_Type": reference,
+        "Strike_Price_GBP_Per_MWh": strike,
+        "Price_Spread_Strike_vs_Market": strike - market,
+        "Price_Spread_Strike_vs_IMRP": strike - imrp,
+        "CFD_Generation_MWh": generation,
+        "CFD_Payments_GBP": (strike - imrp) * generation,
+        "Avoided_GHG_tonnes_CO2e": generation * ghg_rate,
+    })
+
+
+def write_cfd_csv(path, n_rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """Write n_rows of synthetic settlements to path in bounded-memory chunks.
+
+    Each chunk covers its own slice of the date range and draws from its own spawned seed, so
+    the file is identical for a given (n_rows, seed, chunk_rows) and dates stay sorted.
+    """
+    n_chunks = max(1, -(-n_rows // chunk_rows))
+    bounds = pd.date_range("2015-01-01", "2060-12-31", periods=n_chunks + 1).normalize()
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    for i in range(n_chunks):
+        rows = min(chunk_rows, n_rows - i * chunk_rows)
+        end = bounds[i + 1] - pd.Timedelta(days=1) if i < n_chunks - 1 else bounds[i + 1]
+        chunk = generate_cfd(rows, seeds[i], start=bounds[i], end=end)
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Write a synthetic cfd_processed-shaped CSV.")
+    parser.add_argument("path", help="Output CSV path")
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of settlement rows")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    write_cfd_csv(args.path, args.rows, args.seed)
@@ -0,0 +1,114 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from profiling import profiled
+from shared_dataset import CATEGORIES, INDEXED_MEASURES, get_dataset
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+class TimeIndex:
+    """Date-range aggregates over a SharedDataset, whose series are date-ordered runs of rows.
+
+    The sum (and non-null count) of a measure over any date range of a run is the difference of two
+    entries of the dataset's on-disk running totals, found with two searchsorted lookups on that run's
+    dates. Nothing is copied per process: the totals are mapped like the columns and extended in place
+    when rows are ingested.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.version = dataset.version
+        self.groups = dataset.groups
+        self.dates = dataset.columns["Settlement_Date"]
+        self.sums = dataset.sums
+        self.counts = dataset.counts
+        # Runs are date-ordered, so their end rows bound the whole range without a scan
+        if len(self.groups):
+            self._bounds = (self.dates[self.groups["Start"].to_numpy()].min(),
+                            self.dates[self.groups["Stop"].to_numpy() - 1].max())
+        else:
+            self._bounds = (self.dates.min(), self.dates.max()) if len(self.dates) else (None, None)
+
+    @property
+    def date_range(self):
+        return pd.Timestamp(self._bounds[0]), pd.Timestamp(self._bounds[1])
+
+    def _edges(self, group, start, end, years):
+        first, stop = int(group["Start"]), int(group["Stop"])
+        series = self.dates[first:stop]
+        lo = first + (int(np.searchsorted(series, start, side="left")) if start is not None else 0)
+        hi = first + (int(np.searchsorted(series, end, side="right")) if end is not None else len(series))
+        hi = max(lo, hi)
+        if years is None:
+            return np.array([lo, hi])
+        inner = first + np.searchsorted(series, years[1:], side="left")
+        return np.concatenate([[lo], np.clip(inner, lo, hi), [hi]])
+
+    @profiled("aggregate.time_query")
+    def query(self, by, measures, stat="mean", start=None, end=None, where=None):
+        """Grouped sum/count/mean of measures over rows dated start..end (inclusive), like cfd_cube.rollup.
+
+        by may hold Technology, Reference_Type and Year; where maps a dimension to its allowed values.
+        """
+        if isinstance(measures, str):
+            measures = [measures]
+        by = list(by or [])
+        start = None if start is None else np.datetime64(pd.Timestamp(start), "s")
+        end = None if end is None else np.datetime64(pd.Timestamp(end), "s")
+        lo_date, hi_date = self._bounds
+        years = None
+        if "Year" in by:
+            first_year = pd.Timestamp(start if start is not None else lo_date).year
+            last_year = pd.Timestamp(end if end is not None else hi_date).year
+            year_numbers = np.arange(first_year, last_year + 1)
+            years = (year_numbers - 1970).astype("datetime64[Y]").astype("datetime64[s]")
+
+        groups = self.groups
+        for dim, allowed in (where or {}).items():
+            groups = groups[groups[dim].isin(allowed)]
+
+        rows = []
+        for _, group in groups.iterrows():
+            edges = self._edges(group, start, end, years)
+            cells = {dim: group[dim] for dim in CATEGORIES}
+            if years is not None:
+                cells["Year"] = year_numbers
+            for m in measures:
+                cells[f"{m}_sum"] = np.diff(self.sums[m][edges])
+                counts = self.counts[m]
+                cells[f"{m}_count"] = np.diff(edges) if counts is None else np.diff(counts[edges])
+            rows.append(pd.DataFrame(cells, index=np.arange(len(edges) - 1)))
+
+        columns = [f"{m}_{part}" for m in measures for part in ("sum", "count")]
+        cells = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=CATEGORIES + ["Year"] + columns)
+        totals = cells.groupby(by)[columns].sum() if by else cells[columns].sum().to_frame().T
+        # Date ranges that hold no rows at all (years outside the data, say) are dropped, not reported as zero
+        totals = totals[totals[[f"{m}_count" for m in measures]].sum(axis=1) > 0]
+
+        result = pd.DataFrame(index=totals.index)
+        for m in measures:
+            n = totals[f"{m}_count"]
+            s = totals[f"{m}_sum"]
+            if stat == "sum":
+                result[m] = s
+            elif stat == "count":
+                result[m] = n
+            elif stat == "mean":
+                result[m] = s / n.where(n > 0)
+            else:
+                raise ValueError(f"Unknown stat: {stat}")
+        return result.reset_index() if by else result.reset_index(drop=True)
+
+
+def get_time_index(**paths):
+    """The process-wide TimeIndex over get_dataset(**paths), swapped for the new version's when the data changes."""
+    dataset = get_dataset(**paths)
+    with _lock:
+        index = _indexes.get(dataset.directory)
+        if index is None or index.version != dataset.version:
+            index = _indexes[dataset.directory] = TimeIndex(dataset)
+        return index